@@ -0,0 +1,103 @@
+"""
+Concurrent GraphQL throughput on SQLite: Django's old defaults vs. the tuned
+settings.
+
+"baseline" opens a fresh connection per request with the default rollback
+journal and deferred transactions, like DATABASES did before DATABASE_URL was
+honoured. "tuned" is what instagram_clone.database builds: persistent
+connections (CONN_MAX_AGE), the WAL pragmas and IMMEDIATE transactions.
+
+Each mode runs in a fresh interpreter against its own seeded database file.
+The interpreter serves the full Django stack on a threaded WSGI server, and
+concurrent clients send the feed query and likePost mutations over HTTP.
+
+    python benchmarks/db_connections.py --concurrency 8 --requests 400
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "instagram_clone.settings")
+os.environ.setdefault("SECRET_KEY", "db-connections-benchmark")
+os.environ.setdefault("FAST_PASSWORD_HASHING", "True")
+
+OPERATIONS = ("posts", "likePost")
+
+
+def measure(mode, users, requests, concurrency, media_root):
+    from django.conf import settings
+
+    if mode == "baseline":
+        # Must happen before the first connection is opened.
+        settings.DATABASES["default"].update(CONN_MAX_AGE=0, CONN_HEALTH_CHECKS=False, OPTIONS={"timeout": 20})
+    settings.ALLOWED_HOSTS = ["*"]
+    settings.RATE_LIMITS = {}
+    settings.MEDIA_ROOT = media_root
+
+    import django
+
+    django.setup()
+    from django.core.management import call_command
+
+    from social import benchmark
+
+    call_command("migrate", verbosity=0)
+    dataset = benchmark.seed_dataset(users=users)
+    base_url, stop = benchmark.start_wsgi_server()
+    try:
+        transport = benchmark.HTTPTransport("wsgi", base_url, benchmark.viewer_token(dataset))
+        counter = benchmark.QueryCounter()
+        counter.install()
+        return {
+            name: benchmark.run_operation(
+                transport, dataset, benchmark.OPERATIONS[name], requests, concurrency, counter
+            )
+            for name in OPERATIONS
+        }
+    finally:
+        stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=400, help="Per operation")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--child", choices=["baseline", "tuned"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        with tempfile.TemporaryDirectory() as media_root:
+            results = measure(args.child, args.users, args.requests, args.concurrency, media_root)
+        print(json.dumps(results))
+        return
+
+    print(f"{args.requests} requests per operation, {args.concurrency} concurrent clients\n")
+    print(f"{'mode':<10}{'operation':<12}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'errors':>8}")
+    throughput = {}
+    for mode in ("baseline", "tuned"):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp}/bench.sqlite3")
+            output = subprocess.run(
+                [
+                    sys.executable, os.path.abspath(__file__), "--child", mode,
+                    "--users", str(args.users), "--requests", str(args.requests),
+                    "--concurrency", str(args.concurrency),
+                ],
+                env=env, check=True, capture_output=True, text=True,
+            ).stdout
+        results = json.loads(output.strip().splitlines()[-1])
+        for name, r in results.items():
+            print(f"{mode:<10}{name:<12}{r['throughput']:>9.1f}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['errors']:>8}")
+        throughput[mode] = sum(r["throughput"] for r in results.values())
+    print(f"\nspeedup: {throughput['tuned'] / throughput['baseline']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Login/registration burst throughput for each hasher, inline vs. process pool.
+
+A "registration" hashes a new password; a "login" verifies one. Each burst
+runs --requests operations from --threads request threads, either inline on
+the thread (the old behaviour) or through social.passwords' process pool.
+
+    python benchmarks/password_hashing.py --requests 64 --threads 8 --workers 4
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "instagram_clone.settings")
+os.environ.setdefault("SECRET_KEY", "password-benchmark")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth.hashers import make_password  # noqa: E402
+from django.test.utils import override_settings  # noqa: E402
+
+from social import passwords  # noqa: E402
+
+HASHERS = {
+    "pbkdf2": "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+    "scrypt": "django.contrib.auth.hashers.ScryptPasswordHasher",
+    "argon2": "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "md5 (fast mode)": "django.contrib.auth.hashers.MD5PasswordHasher",
+}
+
+
+def burst(fn, requests, threads):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(lambda i: fn(f"password-{i}"), range(requests)))
+    return requests / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    print(f"{args.requests} ops, {args.threads} threads, {args.workers} hashing processes, {os.cpu_count()} CPUs\n")
+    print(f"{'hasher':<16}{'mode':<8}{'register/s':>12}{'login/s':>10}")
+    for name, path in HASHERS.items():
+        for mode, workers in (("inline", 0), ("pool", args.workers)):
+            with override_settings(
+                PASSWORD_HASHERS=[path],
+                PASSWORD_HASHING_WORKERS=workers,
+                PASSWORD_HASHING_QUEUE=args.requests,
+                PASSWORD_HASHING_WAIT=60,
+            ):
+                try:
+                    encoded = make_password("password-0")
+                except ValueError as e:
+                    print(f"{name:<16}skipped: {e}")
+                    break
+                passwords.hash_password("warmup")  # start the pool outside the timing
+                register = burst(passwords.hash_password, args.requests, args.threads)
+                login = burst(lambda raw: passwords.verify_password(raw, encoded), args.requests, args.threads)
+                passwords.shutdown()
+            print(f"{name:<16}{mode:<8}{register:>12.1f}{login:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
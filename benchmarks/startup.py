@@ -0,0 +1,66 @@
+"""
+Measure process startup with `python -X importtime`.
+
+Runs a fresh interpreter that sets up Django and builds the GraphQL schema,
+then prints the total import time and the slowest modules by self time.
+
+    python benchmarks/startup.py --runs 5 --top 15
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STARTUP_CODE = (
+    "import django; django.setup(); "
+    "from social.schema import get_schema; get_schema()"
+)
+
+
+def measure_startup(code=STARTUP_CODE):
+    """Return ({module: (self_us, cumulative_us)}, total_us) for one cold start."""
+    env = dict(os.environ)
+    env.setdefault("DJANGO_SETTINGS_MODULE", "instagram_clone.settings")
+    env.setdefault("SECRET_KEY", "startup-benchmark")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    modules = {}
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # Top-level imports are the ones without indentation.
+        if not name.startswith("  "):
+            total += int(cumulative_us)
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    totals = []
+    for _ in range(args.runs):
+        modules, total = measure_startup()
+        totals.append(total)
+
+    print(f"total import time: median {statistics.median(totals) / 1000:.1f} ms "
+          f"(min {min(totals) / 1000:.1f}, max {max(totals) / 1000:.1f}) over {args.runs} runs")
+    print(f"\n{'self ms':>9}  {'cum ms':>9}  module")
+    slowest = sorted(modules.items(), key=lambda item: item[1][0], reverse=True)[: args.top]
+    for name, (self_us, cumulative_us) in slowest:
+        print(f"{self_us / 1000:>9.1f}  {cumulative_us / 1000:>9.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Peak RSS, latency and GC time of a big posts response, model instances vs.
+values mode (social/records.py).
+
+Seeds a throwaway SQLite database with --posts posts, then runs each mode in
+a fresh interpreter so the reported peak RSS belongs to that mode alone.
+
+    python benchmarks/values_mode.py --posts 10000 --runs 5
+"""
+
+import argparse
+import gc
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "instagram_clone.settings")
+os.environ.setdefault("SECRET_KEY", "values-mode-benchmark")
+
+QUERY = """
+    query Feed {
+        posts { id caption image createdAt createdBy { id username } viewerHasLiked viewerHasSaved }
+    }
+"""
+
+
+def seed(posts):
+    import django
+
+    django.setup()
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+
+    from social.models import Post, PostLike
+
+    call_command("migrate", verbosity=0)
+    user = get_user_model().objects.create_user(username="bench", password="x")
+    Post.objects.bulk_create(
+        (
+            Post(caption=f"Post {i} " + "lorem ipsum " * 8, image=f"posts/{i:064x}.jpg", created_by=user, updated_by=user)
+            for i in range(posts)
+        ),
+        batch_size=2000,
+    )
+    PostLike.objects.bulk_create(
+        PostLike(user=user, post_id=pk, created_by=user, updated_by=user)
+        for pk in Post.objects.values_list("pk", flat=True)[::3]
+    )
+
+
+def measure(mode, runs):
+    import django
+
+    django.setup()
+    from django.contrib.auth import get_user_model
+    from django.test import RequestFactory
+    from django.test.utils import override_settings
+
+    from social.schema import get_schema
+
+    schema = get_schema()
+    user = get_user_model().objects.get(username="bench")
+    gc_time = 0.0
+    gc_started = None
+
+    def on_gc(phase, info):
+        nonlocal gc_time, gc_started
+        if phase == "start":
+            gc_started = time.perf_counter()
+        elif gc_started is not None:
+            gc_time += time.perf_counter() - gc_started
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    gc.callbacks.append(on_gc)
+    latencies = []
+    with override_settings(GRAPHQL_VALUES_MODE=mode == "values"):
+        for _ in range(runs):
+            request = RequestFactory().post("/graphql/")
+            request.user = user
+            started = time.perf_counter()
+            result = schema.execute(QUERY, context_value=request)
+            body = json.dumps({"data": result.data})
+            latencies.append(time.perf_counter() - started)
+            assert not result.errors, result.errors
+            nodes = len(result.data["posts"])
+            del result, body
+    gc.callbacks.remove(on_gc)
+    return {
+        "nodes": nodes,
+        "median_ms": statistics.median(latencies) * 1000,
+        "gc_ms": gc_time * 1000 / runs,
+        # ru_maxrss is in KiB on Linux.
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "peak_rss_delta_mb": (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--posts", type=int, default=10000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--child", choices=["models", "values"], help=argparse.SUPPRESS)
+    parser.add_argument("--seed", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.seed:
+        seed(args.posts)
+        return
+    if args.child:
+        print(json.dumps(measure(args.child, args.runs)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp}/bench.sqlite3")
+        script = os.path.abspath(__file__)
+        subprocess.run([sys.executable, script, "--seed", "--posts", str(args.posts)], env=env, check=True)
+
+        print(f"{args.posts} posts, median of {args.runs} runs\n")
+        print(f"{'mode':<8}{'nodes':>7}{'latency ms':>12}{'gc ms':>8}{'peak RSS MB':>13}{'RSS delta MB':>14}")
+        for mode in ("models", "values"):
+            output = subprocess.run(
+                [sys.executable, script, "--child", mode, "--runs", str(args.runs)],
+                env=env, check=True, capture_output=True, text=True,
+            ).stdout
+            r = json.loads(output.strip().splitlines()[-1])
+            print(
+                f"{mode:<8}{r['nodes']:>7}{r['median_ms']:>12.1f}{r['gc_ms']:>8.1f}"
+                f"{r['peak_rss_mb']:>13.1f}{r['peak_rss_delta_mb']:>14.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -27,6 +27,7 @@ DEBUG = True
 ALLOWED_HOSTS = []
 
 import os
+import sys
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -37,6 +38,9 @@ DEBUG = os.getenv("DEBUG", "False") == "True"
 SECRET_KEY = os.getenv("SECRET_KEY", )
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///db.sqlite3")
 
+# manage.py test; several settings below pick test-friendly defaults.
+TESTING = sys.argv[1:2] == ["test"]
+
 
 # Application definition
 
@@ -54,6 +58,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'social.oplog.OperationLogMiddleware',
+    'social.routers.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -64,14 +70,94 @@ MIDDLEWARE = [
 
 GRAPHENE = {
     "SCHEMA": "social.schema.schema",
+    # Graphene runs the last entry first (outermost).
     "MIDDLEWARE": [
-        "graphql_jwt.middleware.JSONWebTokenMiddleware",
+        "social.ratelimit.RateLimitMiddleware",
+        "social.routers.ReplicaRoutingGraphQLMiddleware",
+        "social.auth.CachedJSONWebTokenMiddleware",
     ],
 }
 
+GRAPHQL_JWT = {
+    # Resolve the token's user through an in-process cache instead of
+    # querying auth_user on every request (see social/auth.py).
+    "JWT_GET_USER_BY_NATURAL_KEY_HANDLER": "social.auth.get_user_by_natural_key",
+}
+
+# Cached user snapshots are dropped on save/delete, in every worker sharing
+# the default cache; the TTL bounds staleness for changes made with
+# queryset.update().
+JWT_USER_CACHE_TTL = int(os.getenv("JWT_USER_CACHE_TTL", "60"))
+JWT_USER_CACHE_SIZE = int(os.getenv("JWT_USER_CACHE_SIZE", "1024"))
+
+# Resolve big read-only lists from slotted records of just the selected
+# columns instead of model instances (see social/records.py).
+GRAPHQL_VALUES_MODE = os.getenv("GRAPHQL_VALUES_MODE", "False") == "True"
+
+# One JSON line per GraphQL operation on the "social.oplog" logger, with
+# sampled EXPLAIN plans for slow ones (see social/oplog.py). Summarize with
+# manage.py summarize_oplog.
+OPERATION_LOG = {
+    "SLOW_MS": int(os.getenv("OPERATION_LOG_SLOW_MS", "500")),
+    "EXPLAIN_SAMPLE_RATE": float(os.getenv("OPERATION_LOG_EXPLAIN_SAMPLE_RATE", "0.1")),
+    "EXPLAIN_TOP": 3,
+}
+
+# Logged to OPERATION_LOG_FILE, or stderr with OPERATION_LOG_ENABLED=True;
+# off otherwise.
+OPERATION_LOG_ENABLED = os.getenv("OPERATION_LOG_ENABLED", str(bool(os.getenv("OPERATION_LOG_FILE")))) == "True"
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {"message": {"format": "%(message)s"}},
+    "handlers": {
+        "oplog": (
+            {"class": "logging.FileHandler", "filename": os.environ["OPERATION_LOG_FILE"], "formatter": "message"}
+            if os.getenv("OPERATION_LOG_FILE")
+            else {"class": "logging.StreamHandler", "formatter": "message"}
+        ),
+    },
+    "loggers": {
+        "social.oplog": {
+            "handlers": ["oplog"],
+            # Off unless asked for: a line per request would flood the
+            # console. Tests use assertLogs.
+            "level": "INFO" if OPERATION_LOG_ENABLED and not TESTING else "WARNING",
+            "propagate": False,
+        },
+    },
+}
+
+# Background tasks, see social/tasks.py; run them with manage.py run_workers.
+# Eager mode runs them inline when queued, as the tests do.
+TASKS = {
+    "EAGER": os.getenv("TASKS_EAGER", "False") == "True" or TESTING,
+    "LEASE_SECONDS": int(os.getenv("TASKS_LEASE_SECONDS", "300")),
+    "POLL_INTERVAL": float(os.getenv("TASKS_POLL_INTERVAL", "1.0")),
+}
+
+# Token buckets per viewer and root field, see social/ratelimit.py. Use
+# "social.ratelimit.CacheBucketStore" to share limits between processes.
+RATE_LIMITS = {
+    "STORE": os.getenv("RATE_LIMIT_STORE", "social.ratelimit.LocalBucketStore"),
+    "TRUST_X_FORWARDED_FOR": os.getenv("RATE_LIMIT_TRUST_X_FORWARDED_FOR", "False") == "True",
+    "FIELDS": {
+        # Password hashing makes these expensive; keep them tight.
+        "tokenAuth": {"capacity": 5, "refill_rate": 5 / 60, "cost": 1},
+        "registerUser": {"capacity": 3, "refill_rate": 3 / 3600, "cost": 1},
+        "likePost": {"capacity": 60, "refill_rate": 1.0, "cost": 1},
+        "followUser": {"capacity": 30, "refill_rate": 0.5, "cost": 1},
+        "createComment": {"capacity": 20, "refill_rate": 0.2, "cost": 1},
+        "createPost": {"capacity": 10, "refill_rate": 0.05, "cost": 2},
+        "uploadPostImage": {"capacity": 10, "refill_rate": 0.05, "cost": 2},
+        "uploadProfilePicture": {"capacity": 5, "refill_rate": 0.05, "cost": 1},
+    },
+}
+
 AUTHENTICATION_BACKENDS = [
     "graphql_jwt.backends.JSONWebTokenBackend",
-    "django.contrib.auth.backends.ModelBackend",
+    "social.passwords.PooledModelBackend",
 ]
 
 ROOT_URLCONF = 'instagram_clone.urls'
@@ -98,13 +184,32 @@ WSGI_APPLICATION = 'instagram_clone.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+from .database import database_from_url
+
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': database_from_url(DATABASE_URL, BASE_DIR),
 }
 
+# Optional read replicas, e.g. DATABASE_REPLICA_URLS="postgres://...,postgres://..."
+# GraphQL queries read from them; mutations and all writes use "default".
+DATABASE_REPLICAS = []
+for index, replica_url in enumerate(filter(None, os.getenv("DATABASE_REPLICA_URLS", "").split(","))):
+    alias = f"replica_{index}"
+    DATABASES[alias] = database_from_url(replica_url.strip(), BASE_DIR)
+    DATABASES[alias]["TEST"] = {"MIRROR": "default"}
+    DATABASE_REPLICAS.append(alias)
+
+if TESTING:
+    # A separate database, not a mirror, so routing tests can tell which one
+    # a query read. Not in DATABASE_REPLICAS; tests opt in to routing to it.
+    DATABASES["replica"] = database_from_url("sqlite://", BASE_DIR)
+
+DATABASE_ROUTERS = ["social.routers.PrimaryReplicaRouter"]
+
+# How long a client reads from the primary after a mutation (read-your-writes).
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", "5"))
+REPLICA_HEALTH_CHECK_INTERVAL = float(os.getenv("REPLICA_HEALTH_CHECK_INTERVAL", "5"))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -125,6 +230,35 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing
+# The first hasher is used for new passwords; hashes made with any other
+# listed hasher still verify and are upgraded on the next login.
+# "argon2" needs `uv add "django[argon2]"`; "scrypt" has no dependencies.
+
+_PASSWORD_HASHERS = {
+    "argon2": "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "scrypt": "django.contrib.auth.hashers.ScryptPasswordHasher",
+    "pbkdf2": "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+    "pbkdf2_sha1": "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "bcrypt": "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+}
+PASSWORD_HASHER = os.getenv("PASSWORD_HASHER", "scrypt")
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASHER]] + [
+    path for name, path in _PASSWORD_HASHERS.items() if name != PASSWORD_HASHER
+]
+
+# Test runs and FAST_PASSWORD_HASHING=True (e.g. for populate_db) use a cheap
+# hasher. Never enable this in production.
+FAST_PASSWORD_HASHING = os.getenv("FAST_PASSWORD_HASHING", "False") == "True" or TESTING
+if FAST_PASSWORD_HASHING:
+    PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"] + PASSWORD_HASHERS
+
+# Hash and verify passwords in this many worker processes (0 = inline), with
+# at most PASSWORD_HASHING_QUEUE operations in flight. See social/passwords.py.
+PASSWORD_HASHING_WORKERS = 0 if FAST_PASSWORD_HASHING else int(os.getenv("PASSWORD_HASHING_WORKERS", "2"))
+PASSWORD_HASHING_QUEUE = int(os.getenv("PASSWORD_HASHING_QUEUE", str(max(PASSWORD_HASHING_WORKERS, 1) * 4)))
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
 
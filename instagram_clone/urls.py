@@ -16,14 +16,14 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path
-from graphene_django.views import GraphQLView
 
 from django.conf import settings
-from django.conf.urls.static import static
+
+from social.views import CachedGraphQLView, export_view, media_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path("graphql/", GraphQLView.as_view(graphiql=True)),
+    path("graphql/", CachedGraphQLView.as_view(graphiql=True)),
+    path("export/<str:name>/", export_view, name="export"),
+    path(f"{settings.MEDIA_URL.strip('/')}/<path:path>", media_view, name="media"),
 ]
-
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
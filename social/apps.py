@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class SocialConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'social'
+
+    def ready(self):
+        # Registers the user cache invalidation, report counting, HTTP cache
+        # watermark and hashtag count/score signals, and the background
+        # tasks workers can run.
+        from . import archive, auth, hashtags, http_cache, moderation, notifications  # noqa: F401
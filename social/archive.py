@@ -0,0 +1,232 @@
+"""
+Archival of old rows and chunked account deletion.
+
+Messages, notifications, stories and soft-deleted posts are moved into
+ArchivedRow once they are older than their policy, so the hot tables and
+their indexes only hold recent data. Everything runs in batches of
+batch_size rows, one short transaction each, optionally pausing between
+batches so replicas and concurrent writers keep up:
+
+    ARCHIVE_AFTER_DAYS = {"messages": 365, "notifications": 90}  # overrides
+
+Deleting a user in one go cascades through created_by/updated_by on every
+table inside a single transaction. request_account_deletion() only
+deactivates the account and queues the purge_account task; purge_user()
+then deletes the user's rows table by table in batches, leaves first, so the
+final DELETE of the user row has almost nothing left to cascade.
+process_account_deletions() picks up any deletion the task didn't finish.
+"""
+
+import time
+from collections import namedtuple
+from datetime import timedelta
+from graphlib import TopologicalSorter
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db import models, transaction
+from django.utils import timezone
+
+from .exporting import columns
+from .http_cache import bump_watermark
+from .models import AccountDeletion, ArchivedRow, Comment, Message, Notification, Post, Report, Story
+from .tasks import task
+
+ArchivePolicy = namedtuple("ArchivePolicy", ["model", "date_field", "days", "m2m"])
+
+ARCHIVE_POLICIES = {
+    # Only soft-deleted posts; deleted_at is null for live ones.
+    "posts": ArchivePolicy(Post, "deleted_at", 30, ("likes",)),
+    "stories": ArchivePolicy(Story, "created_at", 30, ("viewers",)),
+    "messages": ArchivePolicy(Message, "created_at", 365, ()),
+    "notifications": ArchivePolicy(Notification, "created_at", 90, ()),
+}
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def partition_of(value):
+    return value.year * 100 + value.month
+
+
+def get_cutoff(name, now=None):
+    policy = ARCHIVE_POLICIES[name]
+    days = getattr(settings, "ARCHIVE_AFTER_DAYS", {}).get(name, policy.days)
+    return (now or timezone.now()) - timedelta(days=days)
+
+
+def _archive(source, queryset, m2m=()):
+    """Copy queryset into ArchivedRow (with m2m ids embedded) and delete it."""
+    model = queryset.model
+    rows = list(queryset.values(*columns(model)))
+    if not rows:
+        return 0
+    pks = [row["id"] for row in rows]
+    for field_name in m2m:
+        field = model._meta.get_field(field_name)
+        source_column = f"{field.m2m_field_name()}_id"
+        target_column = f"{field.m2m_reverse_field_name()}_id"
+        related = {}
+        for pk, target in field.remote_field.through.objects.filter(
+            **{f"{source_column}__in": pks}
+        ).values_list(source_column, target_column):
+            related.setdefault(pk, []).append(target)
+        for row in rows:
+            row[field_name] = related.get(row["id"], [])
+
+    ArchivedRow.objects.bulk_create(
+        [
+            ArchivedRow(source=source, partition=partition_of(row["created_at"]), original_id=row["id"], data=row)
+            for row in rows
+        ],
+        ignore_conflicts=True,
+    )
+    delete_rows(model, pks)
+    return len(rows)
+
+
+# Models pointing at any content through a generic relation, which doesn't
+# cascade.
+GENERIC_DEPENDENTS = (Comment, Report)
+
+
+def delete_rows(model, pks):
+    """Delete model rows by pk, taking along what a plain cascade would miss."""
+    content_type = ContentType.objects.get_for_model(model)
+    for dependent in GENERIC_DEPENDENTS:
+        dependent_pks = list(
+            dependent._base_manager.filter(content_type=content_type, object_id__in=pks).values_list("pk", flat=True)
+        )
+        if dependent_pks:
+            delete_rows(dependent, dependent_pks)  # Comments on comments, reports on those...
+    model._base_manager.filter(pk__in=pks).delete()
+
+
+def archive_batch(name, cutoff, batch_size=DEFAULT_BATCH_SIZE):
+    """Archive up to batch_size rows of policy name older than cutoff."""
+    policy = ARCHIVE_POLICIES[name]
+    with transaction.atomic():
+        pks = list(
+            policy.model._base_manager.filter(**{f"{policy.date_field}__lt": cutoff})
+            .order_by(policy.date_field, "pk")
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if not pks:
+            return 0
+        if policy.model is Post:
+            _archive(
+                "comments",
+                Comment.objects.filter(content_type=ContentType.objects.get_for_model(Post), object_id__in=pks),
+            )
+        return _archive(name, policy.model._base_manager.filter(pk__in=pks), policy.m2m)
+
+
+def run_archival(names=None, batch_size=DEFAULT_BATCH_SIZE, pause=0, max_batches=None, now=None):
+    """Archive every policy in names (default all); return {name: rows archived}."""
+    archived = {}
+    for name in names or ARCHIVE_POLICIES:
+        cutoff = get_cutoff(name, now)
+        total = batches = 0
+        while max_batches is None or batches < max_batches:
+            count = archive_batch(name, cutoff, batch_size)
+            if not count:
+                break
+            total += count
+            batches += 1
+            if pause:
+                time.sleep(pause)
+        if total:
+            # Deletes of models without receivers send no signals.
+            bump_watermark(ARCHIVE_POLICIES[name].model)
+        archived[name] = total
+    return archived
+
+
+def prune_archive(before_partition, batch_size=DEFAULT_BATCH_SIZE * 10):
+    """Drop archived rows created before the YYYYMM partition; return the count."""
+    total = 0
+    while True:
+        pks = list(
+            ArchivedRow.objects.filter(partition__lt=before_partition).values_list("pk", flat=True)[:batch_size]
+        )
+        if not pks:
+            return total
+        total += ArchivedRow.objects.filter(pk__in=pks)._raw_delete(ArchivedRow.objects.db)
+
+
+def request_account_deletion(user):
+    """Deactivate user now and queue the data for purge_user()."""
+    with transaction.atomic():
+        user.is_active = False
+        user.save(update_fields=["is_active"])
+        deletion, created = AccountDeletion.objects.get_or_create(
+            deleted_user_id=user.pk, defaults={"username": user.get_username()}
+        )
+        if created:
+            purge_account.delay(deletion.pk)
+    return deletion
+
+
+def user_references():
+    """[(model, field name)] of social rows deleted with a user, leaves first."""
+    User = get_user_model()
+    references = []
+    graph = {}
+    for model in apps.get_app_config("social").get_models(include_auto_created=True):
+        graph.setdefault(model, set())
+        for field in model._meta.concrete_fields:
+            if not field.is_relation or field.related_model is model:
+                continue
+            if field.related_model is User:
+                if field.remote_field.on_delete is models.CASCADE:
+                    references.append((model, field.name))
+            else:
+                # model must be emptied before the model it points at.
+                graph.setdefault(field.related_model, set()).add(model)
+    order = {model: i for i, model in enumerate(TopologicalSorter(graph).static_order())}
+    return sorted(references, key=lambda reference: order[reference[0]])
+
+
+def purge_user(user_id, batch_size=DEFAULT_BATCH_SIZE, pause=0):
+    """Delete user_id's rows in batches, then the user; return rows deleted."""
+    total = 0
+    for model, field_name in user_references():
+        while True:
+            with transaction.atomic():
+                pks = list(
+                    model._base_manager.filter(**{field_name: user_id}).values_list("pk", flat=True)[:batch_size]
+                )
+                if not pks:
+                    break
+                delete_rows(model, pks)
+            total += len(pks)
+            if pause:
+                time.sleep(pause)
+    get_user_model()._base_manager.filter(pk=user_id).delete()
+    return total
+
+
+def process_account_deletions(batch_size=DEFAULT_BATCH_SIZE, pause=0):
+    """Purge every pending AccountDeletion; return how many were completed."""
+    completed = 0
+    for deletion in AccountDeletion.objects.filter(completed_at__isnull=True).order_by("requested_at"):
+        _complete_deletion(deletion, batch_size, pause)
+        completed += 1
+    return completed
+
+
+def _complete_deletion(deletion, batch_size=DEFAULT_BATCH_SIZE, pause=0):
+    purge_user(deletion.deleted_user_id, batch_size, pause)
+    deletion.completed_at = timezone.now()
+    deletion.save(update_fields=["completed_at"])
+
+
+@task(max_attempts=3, retry_delay=60)
+def purge_account(deletion_id):
+    # Purging twice is harmless, so a retry after a partial purge just
+    # carries on where it stopped.
+    deletion = AccountDeletion.objects.filter(pk=deletion_id, completed_at__isnull=True).first()
+    if deletion is not None:
+        _complete_deletion(deletion)
@@ -0,0 +1,149 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from graphql_jwt.middleware import JSONWebTokenMiddleware
+
+from .oplog import note_cache
+
+User = get_user_model()
+
+# Columns copied into the cached snapshot. Everything the resolvers and
+# graphql_jwt look at (is_active, ids for FK assignment) has to be here.
+SNAPSHOT_FIELDS = ("id", "username", "email", "is_active", "is_staff", "is_superuser")
+
+
+class UserCache:
+    """Small thread-safe LRU of username -> user snapshot with a TTL.
+
+    Snapshots live in this process, but each is stamped with the user's
+    version from the shared Django cache, which invalidate() bumps. A user
+    deactivated or deleted through another worker is noticed on the next
+    request, at the cost of one cache get, as long as the default cache is
+    shared between workers (see http_cache).
+    """
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._keys_by_id = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _version_key(user_id):
+        return f"jwt_user:version:{user_id}"
+
+    def get(self, username):
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None:
+                return None
+            expires_at, version, snapshot = entry
+            if expires_at < time.monotonic():
+                self._pop(username)
+                return None
+            self._entries.move_to_end(username)
+        if cache.get(self._version_key(snapshot["id"])) != version:
+            with self._lock:
+                if self._entries.get(username) is entry:
+                    self._pop(username)
+            return None
+        return snapshot
+
+    def set(self, username, snapshot):
+        # Read after the row: an invalidation racing the query can only be
+        # missed if it lands between the two reads.
+        version = cache.get(self._version_key(snapshot["id"]))
+        with self._lock:
+            self._pop(username)
+            self._entries[username] = (time.monotonic() + self.ttl, version, snapshot)
+            self._keys_by_id[snapshot["id"]] = username
+            while len(self._entries) > self.maxsize:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self._keys_by_id.pop(evicted["id"], None)
+
+    def invalidate(self, user_id):
+        # Entries stamped before this outlive the key by at most the TTL.
+        cache.set(self._version_key(user_id), time.time_ns(), self.ttl)
+        with self._lock:
+            username = self._keys_by_id.pop(user_id, None)
+            if username is not None:
+                self._entries.pop(username, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_id.clear()
+
+    def _pop(self, username):
+        entry = self._entries.pop(username, None)
+        if entry is not None:
+            self._keys_by_id.pop(entry[2]["id"], None)
+
+
+user_cache = UserCache(
+    maxsize=getattr(settings, "JWT_USER_CACHE_SIZE", 1024),
+    ttl=getattr(settings, "JWT_USER_CACHE_TTL", 60),
+)
+
+
+def _build_user(snapshot):
+    # A User loaded with only the snapshot columns, without touching
+    # auth_user. The other columns are deferred like with .only(): reading
+    # one fetches it, and save() writes just the loaded columns instead of
+    # blanking password, date_joined and last_login.
+    # from_db() wants the values in model field order.
+    names = [f.attname for f in User._meta.concrete_fields if f.attname in snapshot]
+    return User.from_db("default", names, [snapshot[name] for name in names])
+
+
+def get_user_by_natural_key(username):
+    """Drop-in for graphql_jwt's JWT_GET_USER_BY_NATURAL_KEY_HANDLER."""
+    snapshot = user_cache.get(username)
+    note_cache("jwt_user", hit=snapshot is not None)
+    if snapshot is None:
+        snapshot = (
+            User._default_manager.filter(**{User.USERNAME_FIELD: username})
+            .values(*SNAPSHOT_FIELDS)
+            .first()
+        )
+        if snapshot is None:
+            return None
+        user_cache.set(username, snapshot)
+    return _build_user(snapshot)
+
+
+def invalidate_user(sender, instance, **kwargs):
+    user_cache.invalidate(instance.pk)
+
+
+post_save.connect(invalidate_user, sender=User, dispatch_uid="social_auth_invalidate_save")
+post_delete.connect(invalidate_user, sender=User, dispatch_uid="social_auth_invalidate_delete")
+
+
+class CachedJSONWebTokenMiddleware(JSONWebTokenMiddleware):
+    """Authenticate once per request instead of once per resolved field.
+
+    Only root fields can need authentication, so nested fields skip the
+    middleware entirely, and once a root field has resolved the viewer the
+    result is reused for the rest of the operation.
+    """
+
+    def resolve(self, next, root, info, **kwargs):
+        if info.path.prev is not None:
+            return next(root, info, **kwargs)
+
+        context = info.context
+        if getattr(context, "_jwt_authenticated", False):
+            return next(root, info, **kwargs)
+
+        result = super().resolve(next, root, info, **kwargs)
+        user = getattr(context, "user", None)
+        if user is not None and user.is_authenticated:
+            context._jwt_authenticated = True
+        return result
@@ -0,0 +1,321 @@
+"""
+Benchmark harness for the GraphQL API, driven by `manage.py benchmark_api`.
+
+Seeds a throwaway test database, runs every operation in OPERATIONS through a
+transport (Django test client or a real WSGI/ASGI server on localhost) and
+reports throughput, latency percentiles and SQL queries per operation.
+"""
+
+import base64
+import json
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from urllib.request import Request, urlopen
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import Client
+from graphql_jwt.shortcuts import get_token
+
+from .models import Follow, Post, PostLike
+
+User = get_user_model()
+
+# 1x1 transparent PNG used for the upload operation.
+PIXEL_PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII="
+)
+
+
+def seed_dataset(users=50, posts_per_user=20, follows_per_user=10, likes_per_user=20, seed=0):
+    """Bulk-create a deterministic dataset and return the ids the operations need."""
+    rng = random.Random(seed)
+    password = make_password("password123")
+    User.objects.bulk_create(
+        User(username=f"bench_{i}", email=f"bench_{i}@example.com", password=password)
+        for i in range(users)
+    )
+    user_ids = list(User.objects.filter(username__startswith="bench_").values_list("id", flat=True))
+
+    Post.objects.bulk_create(
+        (
+            Post(caption=f"post {i} by {uid}", image=f"posts/{uid}_{i}.png", created_by_id=uid, updated_by_id=uid)
+            for uid in user_ids
+            for i in range(posts_per_user)
+        ),
+        batch_size=1000,
+    )
+    post_ids = list(Post.objects.values_list("id", flat=True))
+
+    Follow.objects.bulk_create(
+        (
+            Follow(follower_id=uid, following_id=other, created_by_id=uid, updated_by_id=uid)
+            for uid in user_ids
+            for other in rng.sample([u for u in user_ids if u != uid], min(follows_per_user, len(user_ids) - 1))
+        ),
+        batch_size=1000,
+    )
+    PostLike.objects.bulk_create(
+        (
+            PostLike(user_id=uid, post_id=pid, created_by_id=uid, updated_by_id=uid)
+            for uid in user_ids
+            for pid in rng.sample(post_ids, min(likes_per_user, len(post_ids)))
+        ),
+        batch_size=1000,
+    )
+    return {"user_ids": user_ids, "post_ids": post_ids}
+
+
+# Each operation builds (query, variables, files) for iteration i.
+OPERATIONS = {
+    "posts": lambda ds, i: (
+        "query Feed { posts { id caption createdAt createdBy { id username } } }",
+        {},
+        None,
+    ),
+    "likePost": lambda ds, i: (
+        "mutation Like($postId: ID!) { likePost(postId: $postId) { success } }",
+        {"postId": ds["post_ids"][i % len(ds["post_ids"])]},
+        None,
+    ),
+    "followUser": lambda ds, i: (
+        "mutation Follow($userId: ID!) { followUser(userId: $userId) { success } }",
+        {"userId": ds["user_ids"][1 + i % (len(ds["user_ids"]) - 1)]},
+        None,
+    ),
+    "createComment": lambda ds, i: (
+        "mutation Comment($postId: ID!, $createdBy: ID!, $text: String!) {"
+        " createComment(postId: $postId, createdBy: $createdBy, text: $text) { comment { id } } }",
+        {"postId": ds["post_ids"][i % len(ds["post_ids"])], "createdBy": ds["user_ids"][0], "text": f"comment {i}"},
+        None,
+    ),
+    "uploadPostImage": lambda ds, i: (
+        "mutation Upload($image: Upload!, $caption: String!) {"
+        " uploadPostImage(image: $image, caption: $caption) { success } }",
+        {"image": None, "caption": f"upload {i}"},
+        {"image": (f"bench_{i}.png", PIXEL_PNG, "image/png")},
+    ),
+}
+
+
+class QueryCounter:
+    """Counts SQL statements on every connection, from any thread."""
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        with self._lock:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+    def _install(self, connection, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+    def install(self):
+        for connection in connections.all():
+            self._install(connection)
+        connection_created.connect(self._install, weak=False)
+
+    def uninstall(self):
+        connection_created.disconnect(self._install)
+        for connection in connections.all():
+            if self in connection.execute_wrappers:
+                connection.execute_wrappers.remove(self)
+
+
+def _multipart(query, variables, files):
+    # GraphQL multipart request spec: operations + map + one part per file.
+    boundary = uuid.uuid4().hex
+    file_map = {str(n): [f"variables.{name}"] for n, name in enumerate(files)}
+    parts = [
+        ("operations", None, json.dumps({"query": query, "variables": variables}).encode(), None),
+        ("map", None, json.dumps(file_map).encode(), None),
+    ]
+    for n, (filename, content, content_type) in enumerate(files.values()):
+        parts.append((str(n), filename, content, content_type))
+
+    body = b""
+    for name, filename, content, content_type in parts:
+        disposition = f'form-data; name="{name}"'
+        if filename:
+            disposition += f'; filename="{filename}"'
+        body += f"--{boundary}\r\nContent-Disposition: {disposition}\r\n".encode()
+        if content_type:
+            body += f"Content-Type: {content_type}\r\n".encode()
+        body += b"\r\n" + content + b"\r\n"
+    body += f"--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+class ClientTransport:
+    """In-process requests through django.test.Client."""
+
+    name = "client"
+
+    def __init__(self, token):
+        self.client = Client()
+        self.headers = {"HTTP_AUTHORIZATION": f"JWT {token}"}
+
+    def execute(self, query, variables, files):
+        if files:
+            body, content_type = _multipart(query, variables, files)
+            response = self.client.generic("POST", "/graphql/", body, content_type=content_type, **self.headers)
+        else:
+            response = self.client.post(
+                "/graphql/",
+                json.dumps({"query": query, "variables": variables}),
+                content_type="application/json",
+                **self.headers,
+            )
+        return response.json()
+
+
+class HTTPTransport:
+    """Requests over a socket to a server running on base_url."""
+
+    def __init__(self, name, base_url, token):
+        self.name = name
+        self.url = base_url.rstrip("/") + "/graphql/"
+        self.token = token
+        # Fetch a CSRF cookie once; GraphQLView is CSRF protected.
+        with urlopen(self.url + "?query=%7B__typename%7D") as response:
+            cookie = SimpleCookie(response.headers.get("Set-Cookie", ""))
+        self.csrf = cookie["csrftoken"].value if "csrftoken" in cookie else ""
+
+    def execute(self, query, variables, files):
+        if files:
+            body, content_type = _multipart(query, variables, files)
+        else:
+            body = json.dumps({"query": query, "variables": variables}).encode()
+            content_type = "application/json"
+        request = Request(
+            self.url,
+            data=body,
+            headers={
+                "Content-Type": content_type,
+                "Authorization": f"JWT {self.token}",
+                "X-CSRFToken": self.csrf,
+                "Cookie": f"csrftoken={self.csrf}",
+                "Referer": self.url,
+            },
+        )
+        with urlopen(request) as response:
+            return json.loads(response.read())
+
+
+def start_wsgi_server():
+    from socketserver import ThreadingMixIn
+    from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+    from django.core.wsgi import get_wsgi_application
+
+    class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+        daemon_threads = True
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    server = make_server(
+        "127.0.0.1", 0, get_wsgi_application(), server_class=ThreadingWSGIServer, handler_class=QuietHandler
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", server.shutdown
+
+
+def start_asgi_server():
+    import socket
+
+    import uvicorn
+
+    from django.core.asgi import get_asgi_application
+
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+
+    server = uvicorn.Server(uvicorn.Config(get_asgi_application(), host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+    def stop():
+        server.should_exit = True
+
+    return f"http://127.0.0.1:{port}", stop
+
+
+def viewer_token(dataset):
+    return get_token(User.objects.get(id=dataset["user_ids"][0]))
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def run_operation(transport, dataset, build, iterations, concurrency, counter, warmup=5):
+    for i in range(warmup):
+        transport.execute(*build(dataset, i))
+
+    errors = []
+
+    def timed(i):
+        started = time.perf_counter()
+        result = transport.execute(*build(dataset, warmup + i))
+        elapsed = time.perf_counter() - started
+        if result.get("errors"):
+            errors.append(result["errors"][0].get("message"))
+        return elapsed
+
+    queries_before = counter.count
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(concurrency) as pool:
+            latencies = list(pool.map(timed, range(iterations)))
+    else:
+        latencies = [timed(i) for i in range(iterations)]
+    wall = time.perf_counter() - started
+    queries = counter.count - queries_before
+
+    latencies.sort()
+    return {
+        "iterations": iterations,
+        "throughput": round(iterations / wall, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "queries": round(queries / iterations, 2),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+    }
+
+
+def compare(baseline, current, threshold):
+    """Return a list of human readable regressions of current against baseline."""
+    regressions = []
+    for name, base in baseline["operations"].items():
+        now = current["operations"].get(name)
+        if now is None:
+            continue
+        if now["errors"] > base["errors"]:
+            regressions.append(f"{name}: errors {base['errors']} -> {now['errors']}")
+        if now["queries"] > base["queries"]:
+            regressions.append(f"{name}: queries {base['queries']} -> {now['queries']}")
+        if base["p95_ms"] and now["p95_ms"] > base["p95_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p95 {base['p95_ms']}ms -> {now['p95_ms']}ms")
+        if base["throughput"] and now["throughput"] < base["throughput"] * (1 - threshold):
+            regressions.append(f"{name}: throughput {base['throughput']} -> {now['throughput']} ops/s")
+    return regressions
@@ -0,0 +1,171 @@
+"""
+Streaming export and bulk import of social data.
+
+Rows are read with QuerySet.values().iterator(chunk_size=...), which uses a
+server-side cursor on Postgres and fetchmany() on SQLite, and every output
+line is produced by a generator, so memory use depends on chunk_size and not
+on the table size.
+
+Formats (one JSON document per line either way):
+    ndjson    one object per row: {"id": 1, "caption": "...", ...}
+    columnar  one object per chunk: {"columns": [...], "data": [[col0...], [col1...]]}
+"""
+
+import json
+from contextlib import contextmanager, nullcontext
+from itertools import islice
+
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+
+from .http_cache import bump_watermark
+from .models import (
+    Comment,
+    Follow,
+    Hashtag,
+    HashtagPost,
+    Message,
+    Notification,
+    Post,
+    PostLike,
+    PostSave,
+    Profile,
+    Report,
+    SavedCollection,
+    Story,
+)
+
+EXPORTABLE = {
+    "profiles": Profile,
+    "posts": Post,
+    "comments": Comment,
+    "post_likes": PostLike,
+    "follows": Follow,
+    "stories": Story,
+    "story_viewers": Story.viewers.through,
+    "messages": Message,
+    "notifications": Notification,
+    "hashtags": Hashtag,
+    "hashtag_posts": HashtagPost,
+    "saved_collections": SavedCollection,
+    "post_saves": PostSave,
+    "reports": Report,
+}
+
+FORMATS = ("ndjson", "columnar")
+
+DEFAULT_CHUNK_SIZE = 2000
+
+_encoder = DjangoJSONEncoder(separators=(",", ":"))
+
+
+def get_model(name):
+    try:
+        return EXPORTABLE[name]
+    except KeyError:
+        raise ValueError(f"Unknown export {name!r}, choose from {', '.join(EXPORTABLE)}")
+
+
+def columns(model):
+    # attnames, so foreign keys come out as plain ids (created_by_id).
+    return [field.attname for field in model._meta.concrete_fields]
+
+
+def iter_rows(model, chunk_size=DEFAULT_CHUNK_SIZE):
+    return (
+        model._default_manager.order_by("pk")
+        .values_list(*columns(model))
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def export_lines(model, format="ndjson", chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield the export of model as encoded lines ending in a newline."""
+    names = columns(model)
+    rows = iter_rows(model, chunk_size)
+    if format == "ndjson":
+        for row in rows:
+            yield _encoder.encode(dict(zip(names, row))) + "\n"
+    elif format == "columnar":
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            yield _encoder.encode({"columns": names, "data": [list(col) for col in zip(*chunk)]}) + "\n"
+    else:
+        raise ValueError(f"Unknown format {format!r}, choose from {', '.join(FORMATS)}")
+
+
+def parse_lines(lines):
+    """Turn exported lines of either format back into row dicts."""
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if "columns" in record and "data" in record:
+            names = record["columns"]
+            for values in zip(*record["data"]):
+                yield dict(zip(names, values))
+        else:
+            yield record
+
+
+@contextmanager
+def deferred_indexes(model):
+    """Drop the table's plain secondary indexes and rebuild them afterwards.
+
+    Maintaining indexes row by row is most of the cost of a big import;
+    building them once at the end is much cheaper. Unique and primary key
+    indexes are kept so constraints are still enforced during the load.
+    Must run inside a transaction.
+    """
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s", [table])
+        elif connection.vendor == "sqlite":
+            cursor.execute(
+                "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = %s AND sql IS NOT NULL",
+                [table],
+            )
+        else:
+            yield
+            return
+        indexes = [(name, sql) for name, sql in cursor.fetchall() if "UNIQUE" not in sql.upper()]
+        for name, _ in indexes:
+            cursor.execute(f"DROP INDEX {connection.ops.quote_name(name)}")
+    # Only rebuild on success; on error the surrounding transaction rolls
+    # back the drops as well.
+    yield
+    with connection.cursor() as cursor:
+        for _, sql in indexes:
+            cursor.execute(sql)
+
+
+def import_rows(model, rows, batch_size=1000, defer_indexes=False):
+    """bulk_create rows (dicts keyed by attname) in batches; return the count."""
+    names = set(columns(model))
+    total = 0
+    with transaction.atomic():
+        with deferred_indexes(model) if defer_indexes else nullcontext():
+            rows = iter(rows)
+            while True:
+                batch = [
+                    model(**{key: value for key, value in row.items() if key in names})
+                    for row in islice(rows, batch_size)
+                ]
+                if not batch:
+                    break
+                model._default_manager.bulk_create(batch, batch_size=batch_size)
+                total += len(batch)
+
+        # Explicit ids don't advance Postgres sequences.
+        sequence_sql = connection.ops.sequence_reset_sql(no_style(), [model])
+        if sequence_sql:
+            with connection.cursor() as cursor:
+                for sql in sequence_sql:
+                    cursor.execute(sql)
+    # bulk_create sends no signals.
+    bump_watermark(model)
+    return total
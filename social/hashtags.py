@@ -0,0 +1,149 @@
+"""
+Hashtag pages: tagging, denormalized post counts and top-post scores.
+
+A tag page shows a tag's top and recent posts from HashtagPost, which is
+indexed on (hashtag, score) and (hashtag, created_at), so a page reads
+page-size rows however many posts the tag has. Hashtag.post_count and
+HashtagPost.score are kept up to date by the signal handlers below:
+
+    score = likes * LIKE_WEIGHT + comments * COMMENT_WEIGHT
+
+New posts are tagged by the tag_new_post background task. bulk_create and
+queryset.update() send no signals; recompute() rebuilds
+both from the source tables (manage.py recompute_hashtags).
+"""
+
+import re
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Count, F, Value
+from django.db.models.functions import Greatest
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .http_cache import bump_watermark
+from .models import Comment, Hashtag, HashtagPost, Post, PostLike
+from .tasks import task
+
+HASHTAG_PATTERN = re.compile(r"#(\w{1,50})")
+
+LIKE_WEIGHT = 1
+COMMENT_WEIGHT = 2
+
+
+def normalize(name):
+    return name.lstrip("#").lower()
+
+
+def tag_post(post):
+    """Link post to the hashtags in its caption, creating new ones."""
+    names = {normalize(name) for name in HASHTAG_PATTERN.findall(post.caption or "")}
+    if not names:
+        return []
+    Hashtag.objects.bulk_create([Hashtag(name=name) for name in names], ignore_conflicts=True)
+    hashtags = list(Hashtag.objects.filter(name__in=names))
+    post.hashtags.add(*hashtags, through_defaults={"created_at": post.created_at})
+    return hashtags
+
+
+@task
+def tag_new_post(post_id):
+    post = Post.objects.filter(pk=post_id).first()
+    if post is not None:
+        tag_post(post)
+
+
+def _add_to_count(hashtag_ids, delta):
+    Hashtag.objects.filter(pk__in=hashtag_ids).update(post_count=Greatest(F("post_count") + delta, Value(0)))
+    bump_watermark(Hashtag, HashtagPost)
+
+
+def _add_to_score(post_id, delta):
+    if HashtagPost.objects.filter(post_id=post_id).update(score=F("score") + delta):
+        bump_watermark(HashtagPost)
+
+
+@receiver(m2m_changed, sender=HashtagPost, dispatch_uid="social_hashtags_links_added")
+def links_added(sender, instance, action, reverse, pk_set, **kwargs):
+    # add() bulk-creates links without post_save; pk_set only has new ones.
+    if action != "post_add" or not pk_set:
+        return
+    if reverse:
+        _add_to_count(pk_set, 1)  # post.hashtags.add(...)
+    else:
+        _add_to_count([instance.pk], len(pk_set))  # hashtag.posts.add(...)
+
+
+@receiver(post_save, sender=HashtagPost, dispatch_uid="social_hashtags_link_saved")
+def link_saved(sender, instance, created, **kwargs):
+    if created:
+        _add_to_count([instance.hashtag_id], 1)
+
+
+@receiver(post_delete, sender=HashtagPost, dispatch_uid="social_hashtags_link_deleted")
+def link_deleted(sender, instance, **kwargs):
+    # remove(), clear() and cascades all delete through the queryset, which
+    # sends this for every row.
+    _add_to_count([instance.hashtag_id], -1)
+
+
+@receiver(post_save, sender=PostLike, dispatch_uid="social_hashtags_like_saved")
+def like_saved(sender, instance, created, **kwargs):
+    if created:
+        _add_to_score(instance.post_id, LIKE_WEIGHT)
+
+
+@receiver(post_delete, sender=PostLike, dispatch_uid="social_hashtags_like_deleted")
+def like_deleted(sender, instance, **kwargs):
+    _add_to_score(instance.post_id, -LIKE_WEIGHT)
+
+
+def _is_post_comment(comment):
+    return comment.content_type_id == ContentType.objects.get_for_model(Post).pk
+
+
+@receiver(post_save, sender=Comment, dispatch_uid="social_hashtags_comment_saved")
+def comment_saved(sender, instance, created, **kwargs):
+    if created and _is_post_comment(instance):
+        _add_to_score(instance.object_id, COMMENT_WEIGHT)
+
+
+@receiver(post_delete, sender=Comment, dispatch_uid="social_hashtags_comment_deleted")
+def comment_deleted(sender, instance, **kwargs):
+    if _is_post_comment(instance):
+        _add_to_score(instance.object_id, -COMMENT_WEIGHT)
+
+
+def recompute(batch_size=1000):
+    """Rebuild every post_count and score from the source tables."""
+    post_type = ContentType.objects.get_for_model(Post)
+    last_id = 0
+    while True:
+        links = list(HashtagPost.objects.filter(pk__gt=last_id).order_by("pk")[:batch_size])
+        if not links:
+            break
+        post_ids = {link.post_id for link in links}
+        likes = dict(
+            PostLike.objects.filter(post_id__in=post_ids)
+            .values("post_id")
+            .annotate(n=Count("id"))
+            .values_list("post_id", "n")
+        )
+        comments = dict(
+            Comment.objects.filter(content_type=post_type, object_id__in=post_ids)
+            .values("object_id")
+            .annotate(n=Count("id"))
+            .values_list("object_id", "n")
+        )
+        for link in links:
+            link.score = likes.get(link.post_id, 0) * LIKE_WEIGHT + comments.get(link.post_id, 0) * COMMENT_WEIGHT
+        HashtagPost.objects.bulk_update(links, ["score"], batch_size=batch_size)
+        last_id = links[-1].pk
+
+    counts = HashtagPost.objects.values("hashtag_id").annotate(n=Count("id")).values_list("hashtag_id", "n")
+    with transaction.atomic():
+        Hashtag.objects.update(post_count=0)
+        for hashtag_id, count in list(counts):
+            Hashtag.objects.filter(pk=hashtag_id).update(post_count=count)
+    bump_watermark(Hashtag, HashtagPost)
@@ -0,0 +1,158 @@
+"""
+HTTP caching for read-only GraphQL GET requests.
+
+Every cacheable root field has a CacheHint: how long a response may be reused,
+whether it may be shared between viewers, and which models it reads. Each
+model has a watermark, the time of its last write, kept in the Django cache
+and bumped by post_save/post_delete (and explicitly by code doing
+queryset.update()). A response's ETag is a hash of the operation, the viewer
+and those watermarks, so a revalidation can be answered with 304 Not Modified
+without executing the query or touching the database.
+"""
+
+import hashlib
+import json
+from collections import namedtuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Max
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.utils import timezone
+from graphql import FieldNode, GraphQLError, OperationType, parse
+
+from .oplog import note_cache
+from .models import Comment, Follow, Hashtag, HashtagPost, Post, PostLike, PostSave, Story
+
+User = get_user_model()
+
+CacheHint = namedtuple("CacheHint", ["max_age", "scope", "models"])
+
+PUBLIC = "public"
+PRIVATE = "private"
+
+# Root fields that may be served from HTTP caches. Fields not listed here make
+# the whole response uncacheable.
+CACHE_HINTS = {
+    "posts": CacheHint(30, PRIVATE, (Post, PostLike, PostSave)),
+    "comments": CacheHint(30, PRIVATE, (Comment, Post)),
+    "stories": CacheHint(60, PUBLIC, (Story,)),
+    # Private because their topPosts/recentPosts carry viewerHasLiked and
+    # viewerHasSaved.
+    "hashtags": CacheHint(30, PRIVATE, (Hashtag, HashtagPost, Post, PostLike, PostSave)),
+    "hashtag": CacheHint(30, PRIVATE, (Hashtag, HashtagPost, Post, PostLike, PostSave)),
+    "savedPosts": CacheHint(30, PRIVATE, (PostSave, Post, PostLike)),
+    "savedCollections": CacheHint(60, PRIVATE, (PostSave,)),
+}
+
+# Every cached field reaches users (createdBy, viewers, ...), so user edits
+# move every ETag.
+ALWAYS_WATERMARKED = (User,)
+
+# Extra models whose writes should move watermarks.
+WATERMARKED = {model for hint in CACHE_HINTS.values() for model in hint.models} | {Follow, *ALWAYS_WATERMARKED}
+
+# Watermarks live in the default cache, which must be shared (Redis,
+# Memcached, database) when running several worker processes; with the
+# per-process LocMemCache another worker's writes are only noticed when the
+# entry expires and is re-read from the tables.
+WATERMARK_TIMEOUT = getattr(settings, "HTTP_CACHE_WATERMARK_TIMEOUT", 300)
+
+
+def _watermark_key(model):
+    return f"watermark:{model._meta.label_lower}"
+
+
+def bump_watermark(*models):
+    now = timezone.now()
+    cache.set_many({_watermark_key(model): now for model in models}, WATERMARK_TIMEOUT)
+
+
+def get_watermark(models):
+    """Latest write time across models (one cache round trip when warm)."""
+    keys = {_watermark_key(model): model for model in models}
+    found = cache.get_many(keys)
+    note_cache("watermark", hit=len(found) == len(keys))
+    for key, model in keys.items():
+        if key not in found:
+            # Cold cache: seed from the table once.
+            latest = None
+            if any(field.name == "updated_at" for field in model._meta.concrete_fields):
+                latest = model._default_manager.aggregate(latest=Max("updated_at"))["latest"]
+            latest = latest or timezone.now()
+            cache.add(key, latest, WATERMARK_TIMEOUT)
+            found[key] = cache.get(key, latest)
+    return max(found.values())
+
+
+def _on_write(sender, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) <= {"last_login"}:
+        return  # Session logins; not visible in any response.
+    bump_watermark(sender)
+
+
+# add()/remove()/clear() on a many-to-many field write its through table
+# without post_save/post_delete; they move the owning model's watermark.
+_M2M_OWNERS = {}
+for _model in WATERMARKED:
+    for _field in _model._meta.local_many_to_many:
+        _M2M_OWNERS.setdefault(_field.remote_field.through, {_model}).add(_model)
+
+
+def _on_m2m_write(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        bump_watermark(sender, *_M2M_OWNERS[sender])
+
+
+for _model in WATERMARKED:
+    post_save.connect(_on_write, sender=_model, dispatch_uid=f"http_cache_save_{_model.__name__}")
+    post_delete.connect(_on_write, sender=_model, dispatch_uid=f"http_cache_delete_{_model.__name__}")
+for _through in _M2M_OWNERS:
+    m2m_changed.connect(_on_m2m_write, sender=_through, dispatch_uid=f"http_cache_m2m_{_through.__name__}")
+
+
+class CachePolicy(namedtuple("CachePolicy", ["max_age", "scope", "models"])):
+    @property
+    def cache_control(self):
+        return f"{self.scope}, max-age={self.max_age}"
+
+
+def policy_for(query, operation_name=None):
+    """Combine the hints of the operation's root fields, or None if uncacheable."""
+    try:
+        document = parse(query)
+    except GraphQLError:
+        return None
+    operations = [d for d in document.definitions if hasattr(d, "operation")]
+    if operation_name:
+        operations = [op for op in operations if op.name and op.name.value == operation_name]
+    if len(operations) != 1 or operations[0].operation != OperationType.QUERY:
+        return None
+
+    hints = []
+    for selection in operations[0].selection_set.selections:
+        if not isinstance(selection, FieldNode):
+            return None  # fragments at the root: not worth analysing
+        if selection.name.value == "__typename":
+            continue
+        hint = CACHE_HINTS.get(selection.name.value)
+        if hint is None:
+            return None
+        hints.append(hint)
+    if not hints:
+        return None
+
+    return CachePolicy(
+        max_age=min(hint.max_age for hint in hints),
+        scope=PRIVATE if any(hint.scope == PRIVATE for hint in hints) else PUBLIC,
+        models=tuple({model for hint in hints for model in hint.models} | set(ALWAYS_WATERMARKED)),
+    )
+
+
+def compute_etag(query, variables, operation_name, viewer_id, watermark):
+    payload = json.dumps(
+        [query, variables or {}, operation_name, viewer_id, watermark.isoformat()],
+        sort_keys=True,
+    )
+    return '"%s"' % hashlib.sha256(payload.encode()).hexdigest()[:32]
@@ -0,0 +1,85 @@
+"""
+Per-request batch loading for fields that would otherwise query once per node.
+
+List resolvers prime the loader with the page they return; the first field
+resolver that needs data then loads it for the whole page with one IN query.
+"""
+
+from .models import PostLike, PostSave
+
+
+class ViewerPostFlags:
+    """viewerHasLiked / viewerHasSaved for the posts resolved in one request."""
+
+    FLAG_QUERIES = {
+        "liked": PostLike.objects,
+        "saved": PostSave.objects,
+    }
+
+    def __init__(self, user):
+        self.user = user
+        self._pending = set()
+        self._loaded = {flag: set() for flag in self.FLAG_QUERIES}
+        self._values = {flag: set() for flag in self.FLAG_QUERIES}
+
+    def prime(self, posts):
+        self._pending.update(post.pk for post in posts)
+        return posts
+
+    def get(self, flag, post_id):
+        if not self.user.is_authenticated:
+            return False
+        if post_id not in self._loaded[flag]:
+            ids = (self._pending - self._loaded[flag]) | {post_id}
+            self._values[flag].update(
+                self.FLAG_QUERIES[flag]
+                .filter(user=self.user, post_id__in=ids)
+                .values_list("post_id", flat=True)
+            )
+            self._loaded[flag].update(ids)
+        return post_id in self._values[flag]
+
+    def forget(self, post_id):
+        # After a mutation changed a flag in this same request.
+        for flag in self.FLAG_QUERIES:
+            self._loaded[flag].discard(post_id)
+            self._values[flag].discard(post_id)
+
+
+def viewer_post_flags(info):
+    context = info.context
+    flags = getattr(context, "_viewer_post_flags", None)
+    if flags is None:
+        flags = context._viewer_post_flags = ViewerPostFlags(context.user)
+    return flags
+
+
+class HashtagPages:
+    """topPosts / recentPosts pages of all hashtags in a hashtags list.
+
+    Query.hashtags primes the hashtags it returns; the first page resolved
+    then loads that page for all of them at once (pagination.keyset_pages).
+    """
+
+    def __init__(self):
+        self.hashtag_ids = set()
+        self._pages = {}
+
+    def prime(self, hashtags):
+        self.hashtag_ids.update(hashtag.pk for hashtag in hashtags)
+        return hashtags
+
+    def get(self, key, hashtag_id, load):
+        # key tells apart fields and arguments; load(ids) fetches the pages.
+        pages = self._pages.get(key)
+        if pages is None:
+            pages = self._pages[key] = load(self.hashtag_ids)
+        return pages.get(hashtag_id, ([], [], False))
+
+
+def hashtag_pages(info):
+    context = info.context
+    pages = getattr(context, "_hashtag_pages", None)
+    if pages is None:
+        pages = context._hashtag_pages = HashtagPages()
+    return pages
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from social import archive
+
+
+class Command(BaseCommand):
+    help = "Move old rows into the archive and purge deleted accounts, in small batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("names", nargs="*", choices=sorted(archive.ARCHIVE_POLICIES))
+        parser.add_argument("--batch-size", type=int, default=archive.DEFAULT_BATCH_SIZE)
+        parser.add_argument("--pause", type=float, default=0, help="Seconds to sleep between batches")
+        parser.add_argument("--max-batches", type=int, help="Stop each policy after this many batches")
+        parser.add_argument("--skip-accounts", action="store_true", help="Don't purge deleted accounts")
+        parser.add_argument(
+            "--prune-months",
+            type=int,
+            help="Also drop archived rows created more than this many months ago",
+        )
+
+    def handle(self, *args, **options):
+        archived = archive.run_archival(
+            options["names"] or None,
+            batch_size=options["batch_size"],
+            pause=options["pause"],
+            max_batches=options["max_batches"],
+        )
+        for name, count in archived.items():
+            self.stdout.write(f"Archived {count} {name}")
+
+        if not options["skip_accounts"]:
+            count = archive.process_account_deletions(options["batch_size"], options["pause"])
+            self.stdout.write(f"Purged {count} deleted accounts")
+
+        if options["prune_months"] is not None:
+            now = timezone.now()
+            months = now.year * 12 + now.month - 1 - options["prune_months"]
+            before = (months // 12) * 100 + months % 12 + 1
+            self.stdout.write(f"Pruned {archive.prune_archive(before)} archived rows before {before}")
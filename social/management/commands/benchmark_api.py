@@ -0,0 +1,126 @@
+import json
+import platform
+import tempfile
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from social import benchmark
+
+
+class Command(BaseCommand):
+    help = "Benchmark GraphQL operations against a seeded throwaway database"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=50, help="Seeded users (posts scale with it)")
+        parser.add_argument("--posts-per-user", type=int, default=20)
+        parser.add_argument("--iterations", type=int, default=200, help="Requests per operation")
+        parser.add_argument("--concurrency", type=int, default=1, help="Parallel requests (server modes)")
+        parser.add_argument(
+            "--server", choices=("client", "wsgi", "asgi"), default="client",
+            help="Django test client, or a real WSGI/ASGI server on localhost",
+        )
+        parser.add_argument(
+            "--operations", nargs="+", choices=sorted(benchmark.OPERATIONS),
+            default=list(benchmark.OPERATIONS),
+        )
+        parser.add_argument("--output", help="Write results as a JSON baseline to this path")
+        parser.add_argument("--compare", help="Fail if results regress against this JSON baseline")
+        parser.add_argument(
+            "--threshold", type=float, default=0.2,
+            help="Allowed relative regression for latency/throughput (default 0.2 = 20%%)",
+        )
+
+    def handle(self, *args, **options):
+        if options["server"] == "client" and options["concurrency"] > 1:
+            raise CommandError("--concurrency needs --server wsgi or asgi")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            if connection.vendor == "sqlite" and options["server"] != "client":
+                # Shared-cache in-memory SQLite locks whole tables; a real
+                # file gets the WAL settings the server would run with.
+                connection.settings_dict["TEST"]["NAME"] = f"{tmp}/benchmark.sqlite3"
+
+            setup_test_environment()
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                # Rate limits would turn most of the mix into rejections.
+                with override_settings(MEDIA_ROOT=f"{tmp}/media", ALLOWED_HOSTS=["*"], RATE_LIMITS={}):
+                    results = self.run(options)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                teardown_test_environment()
+
+        self.print_table(results)
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+            self.stdout.write(f"Baseline written to {options['output']}")
+
+        if options["compare"]:
+            with open(options["compare"]) as f:
+                baseline = json.load(f)
+            regressions = benchmark.compare(baseline, results, options["threshold"])
+            if regressions:
+                raise CommandError("Regressions found:\n  " + "\n  ".join(regressions))
+            self.stdout.write(self.style.SUCCESS("No regressions against baseline"))
+
+    def run(self, options):
+        dataset = benchmark.seed_dataset(users=options["users"], posts_per_user=options["posts_per_user"])
+        token = benchmark.viewer_token(dataset)
+
+        stop = None
+        if options["server"] == "client":
+            transport = benchmark.ClientTransport(token)
+        else:
+            if options["server"] == "wsgi":
+                base_url, stop = benchmark.start_wsgi_server()
+            else:
+                try:
+                    base_url, stop = benchmark.start_asgi_server()
+                except ImportError:
+                    raise CommandError("--server asgi needs uvicorn installed")
+            transport = benchmark.HTTPTransport(options["server"], base_url, token)
+
+        counter = benchmark.QueryCounter()
+        counter.install()
+        try:
+            operations = {
+                name: benchmark.run_operation(
+                    transport, dataset, benchmark.OPERATIONS[name],
+                    options["iterations"], options["concurrency"], counter,
+                )
+                for name in options["operations"]
+            }
+        finally:
+            counter.uninstall()
+            if stop is not None:
+                stop()
+
+        return {
+            "meta": {
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "server": options["server"],
+                "users": options["users"],
+                "posts_per_user": options["posts_per_user"],
+                "iterations": options["iterations"],
+                "concurrency": options["concurrency"],
+            },
+            "operations": operations,
+        }
+
+    def print_table(self, results):
+        header = f"{'operation':<16}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>9}{'errors':>8}"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for name, r in results["operations"].items():
+            self.stdout.write(
+                f"{name:<16}{r['throughput']:>10.1f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}"
+                f"{r['p99_ms']:>10.2f}{r['queries']:>9.1f}{r['errors']:>8}"
+            )
+            if r["first_error"]:
+                self.stdout.write(self.style.WARNING(f"  first error: {r['first_error']}"))
@@ -0,0 +1,46 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from social.schema import get_schema
+
+
+def _user_types(introspection):
+    # Built-in __* types depend on the graphql-core version, not on our schema.
+    schema = introspection["__schema"]
+    return {
+        "queryType": schema["queryType"],
+        "mutationType": schema["mutationType"],
+        "types": sorted(
+            (t for t in schema["types"] if not t["name"].startswith("__")),
+            key=lambda t: t["name"],
+        ),
+    }
+
+
+class Command(BaseCommand):
+    help = "Check the GraphQL schema against the committed schema.json snapshot"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--snapshot", default=str(settings.BASE_DIR / "schema.json"))
+
+    def handle(self, *args, **options):
+        with open(options["snapshot"]) as f:
+            snapshot = json.load(f)["data"]
+
+        expected = _user_types(snapshot)
+        actual = _user_types(get_schema().introspect())
+        if expected != actual:
+            expected_names = {t["name"]: t for t in expected["types"]}
+            actual_names = {t["name"]: t for t in actual["types"]}
+            changed = sorted(
+                name
+                for name in expected_names.keys() | actual_names.keys()
+                if expected_names.get(name) != actual_names.get(name)
+            )
+            raise CommandError(
+                f"Schema differs from {options['snapshot']} in: {', '.join(changed) or 'root types'}. "
+                "Regenerate it with `python manage.py graphql_schema --out schema.json --indent 2`."
+            )
+        self.stdout.write(self.style.SUCCESS("Schema matches snapshot"))
@@ -0,0 +1,33 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from social import exporting
+
+
+class Command(BaseCommand):
+    help = "Stream tables out as NDJSON or columnar JSON chunks"
+
+    def add_arguments(self, parser):
+        parser.add_argument("names", nargs="+", choices=sorted(exporting.EXPORTABLE))
+        parser.add_argument("--format", choices=exporting.FORMATS, default="ndjson")
+        parser.add_argument("--chunk-size", type=int, default=exporting.DEFAULT_CHUNK_SIZE)
+        parser.add_argument(
+            "--output-dir",
+            help="Write <name>.<format>.jsonl files here instead of stdout",
+        )
+
+    def handle(self, *args, **options):
+        for name in options["names"]:
+            model = exporting.get_model(name)
+            lines = exporting.export_lines(model, options["format"], options["chunk_size"])
+            if options["output_dir"]:
+                path = f"{options['output_dir'].rstrip('/')}/{name}.{options['format']}.jsonl"
+                try:
+                    with open(path, "w") as f:
+                        f.writelines(lines)
+                except OSError as e:
+                    raise CommandError(e)
+                self.stderr.write(f"Exported {name} to {path}")
+            else:
+                sys.stdout.writelines(lines)
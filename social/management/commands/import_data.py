@@ -0,0 +1,34 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from social import exporting
+
+
+class Command(BaseCommand):
+    help = "Bulk load a table from an export_data file (NDJSON or columnar)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("name", choices=sorted(exporting.EXPORTABLE))
+        parser.add_argument("path", help="File to read, or - for stdin")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--defer-indexes",
+            action="store_true",
+            help="Drop secondary indexes during the load and rebuild them at the end",
+        )
+
+    def handle(self, *args, **options):
+        model = exporting.get_model(options["name"])
+        try:
+            f = sys.stdin if options["path"] == "-" else open(options["path"])
+        except OSError as e:
+            raise CommandError(e)
+        with f:
+            count = exporting.import_rows(
+                model,
+                exporting.parse_lines(f),
+                batch_size=options["batch_size"],
+                defer_indexes=options["defer_indexes"],
+            )
+        self.stdout.write(self.style.SUCCESS(f"Imported {count} {options['name']}"))
@@ -2,16 +2,20 @@ import random
 from django.core.management.base import BaseCommand
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.auth import get_user_model
-from faker import Faker
+from django.contrib.auth.hashers import make_password
 from social.models import Profile, Post, Comment, Story, Message, Notification, Hashtag, PostSave, Report
 
 User = get_user_model()
-fake = Faker()
 
 class Command(BaseCommand):
     help = "Populate the database with dummy data"
 
     def handle(self, *args, **kwargs):
+        # Imported here so other manage.py commands don't pay for Faker.
+        from faker import Faker
+
+        self.fake = Faker()
+
         self.create_users(10)
         self.create_profiles()
         self.create_posts(20)
@@ -26,11 +30,14 @@ class Command(BaseCommand):
         self.stdout.write(self.style.SUCCESS("Successfully populated the database!"))
 
     def create_users(self, count):
+        # Every dummy user shares a password, so hash it once instead of
+        # paying the hasher's work factor per user.
+        password = make_password("password123")
         for _ in range(count):
-            user = User.objects.create_user(
-                username=fake.user_name(),
-                email=fake.email(),
-                password="password123"
+            user = User.objects.create(
+                username=self.fake.user_name(),
+                email=self.fake.email(),
+                password=password
             )
             self.stdout.write(f"Created user: {user.username}")
     
@@ -38,8 +45,8 @@ class Command(BaseCommand):
         for user in User.objects.all():
             Profile.objects.create(
                 user=user,
-                bio=fake.sentence(),
-                profile_pic=fake.image_url(),
+                bio=self.fake.sentence(),
+                profile_pic=self.fake.image_url(),
                 created_by=user,  # Assign user to created_by
                 updated_by=user
             )
@@ -49,8 +56,8 @@ class Command(BaseCommand):
         users = list(User.objects.all())
         for _ in range(count):
             post = Post.objects.create(
-                caption=fake.text(),
-                image=fake.image_url(),
+                caption=self.fake.text(),
+                image=self.fake.image_url(),
                 created_by=random.choice(users),
                 updated_by=random.choice(users)
             )
@@ -61,7 +68,7 @@ class Command(BaseCommand):
         posts = list(Post.objects.all())
         for _ in range(count):
             comment = Comment.objects.create(
-                text=fake.sentence(),
+                text=self.fake.sentence(),
                 content_object=random.choice(posts),
                 created_by=random.choice(users),
                 updated_by=random.choice(users)
@@ -72,7 +79,7 @@ class Command(BaseCommand):
         users = list(User.objects.all())
         for _ in range(count):
             story = Story.objects.create(
-                image=fake.image_url(),
+                image=self.fake.image_url(),
                 created_by=random.choice(users),
                 updated_by=random.choice(users)
             )
@@ -85,7 +92,7 @@ class Command(BaseCommand):
             message = Message.objects.create(
                 sender=sender,
                 receiver=receiver,
-                text=fake.sentence(),
+                text=self.fake.sentence(),
                 created_by=sender,
                 updated_by=sender
             )
@@ -96,7 +103,7 @@ class Command(BaseCommand):
         for _ in range(count):
             notification = Notification.objects.create(
                 user=random.choice(users),
-                text=fake.sentence(),
+                text=self.fake.sentence(),
                 created_by=random.choice(users),
                 updated_by=random.choice(users)
             )
@@ -104,18 +111,18 @@ class Command(BaseCommand):
     
     def create_hashtags(self, count):
         for _ in range(count):
-            hashtag, created = Hashtag.objects.get_or_create(name=fake.word())
+            hashtag, created = Hashtag.objects.get_or_create(name=self.fake.word())
             self.stdout.write(f"Created hashtag: {hashtag.name}")
     
     def create_post_saves(self, count):
         users = list(User.objects.all())
         posts = list(Post.objects.all())
         for _ in range(count):
-            post_save = PostSave.objects.create(
-                user=random.choice(users),
+            user = random.choice(users)
+            post_save, _ = PostSave.objects.get_or_create(
+                user=user,
                 post=random.choice(posts),
-                created_by=random.choice(users),
-                updated_by=random.choice(users)
+                defaults={"created_by": user, "updated_by": user},
             )
             self.stdout.write(f"Post saved by {post_save.user.username}")
     
@@ -126,7 +133,7 @@ class Command(BaseCommand):
             report = Report.objects.create(
                 reported_by=random.choice(users),
                 content_object=random.choice(posts),
-                reason=fake.sentence(),
+                reason=self.fake.sentence(),
                 created_by=random.choice(users),
                 updated_by=random.choice(users)
             )
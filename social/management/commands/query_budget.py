@@ -0,0 +1,34 @@
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from social import query_budget
+
+
+class Command(BaseCommand):
+    help = "Report SQL queries, time and memory per GraphQL root field at several data sizes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=list(query_budget.SIZES))
+        parser.add_argument("--fields", nargs="+", choices=list(query_budget.CASES), help="Default: all")
+        parser.add_argument("--time-budget-ms", type=float, default=query_budget.TIME_BUDGET_MS)
+        parser.add_argument("--memory-budget-kib", type=int, default=query_budget.MEMORY_BUDGET_KIB)
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as tmp:
+            setup_test_environment()
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                with override_settings(MEDIA_ROOT=f"{tmp}/media", RATE_LIMITS={}):
+                    report = query_budget.run_budget(sorted(options["sizes"]), options["fields"])
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                teardown_test_environment()
+
+        self.stdout.write(query_budget.format_report(report))
+        problems = query_budget.check_budget(report, options["time_budget_ms"], options["memory_budget_kib"])
+        if problems:
+            raise CommandError("Budget exceeded:\n  " + "\n  ".join(problems))
+        self.stdout.write(self.style.SUCCESS("All fields within budget"))
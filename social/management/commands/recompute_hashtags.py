@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from social import hashtags
+
+
+class Command(BaseCommand):
+    help = "Rebuild hashtag post counts and top-post scores from likes and comments"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        hashtags.recompute(options["batch_size"])
+        self.stdout.write(self.style.SUCCESS("Hashtag counts and scores rebuilt"))
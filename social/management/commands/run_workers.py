@@ -0,0 +1,65 @@
+import multiprocessing
+import signal
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from social import tasks
+
+
+def _worker(index, stop, burst, poll_interval):
+    # Children stop through the shared event when the parent is told to,
+    # never in the middle of a task.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    django.setup()
+    tasks.work(f"{tasks.default_worker_id()}-{index}", stop, burst, poll_interval)
+
+
+class Command(BaseCommand):
+    help = "Run background tasks from the queue (social/tasks.py) in N worker processes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=1, help="Worker processes")
+        parser.add_argument("--burst", action="store_true", help="Exit once the queue is empty")
+        parser.add_argument("--poll-interval", type=float, help="Seconds to sleep when the queue is empty")
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options["concurrency"])
+        if concurrency == 1:
+            stop = multiprocessing.Event()
+            previous = self._stop_on_signals(stop)
+            try:
+                count = tasks.work(stop=stop, burst=options["burst"], poll_interval=options["poll_interval"])
+            finally:
+                self._restore_signals(previous)
+            self.stdout.write(f"Ran {count} tasks")
+            return
+
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+        # Forked children must not share the parent's database sockets.
+        connections.close_all()
+        stop = context.Event()
+        processes = [
+            context.Process(target=_worker, args=(i, stop, options["burst"], options["poll_interval"]), daemon=True)
+            for i in range(concurrency)
+        ]
+        for process in processes:
+            process.start()
+        self._stop_on_signals(stop)
+        self.stdout.write(f"Started {concurrency} workers")
+        for process in processes:
+            process.join()
+
+    def _stop_on_signals(self, stop):
+        def handler(signum, frame):
+            self.stdout.write("Stopping after the current tasks...")
+            stop.set()
+
+        return {signum: signal.signal(signum, handler) for signum in (signal.SIGINT, signal.SIGTERM)}
+
+    def _restore_signals(self, previous):
+        for signum, handler in previous.items():
+            signal.signal(signum, handler)
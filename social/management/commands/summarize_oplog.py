@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from social import oplog
+
+SORT_KEYS = ["p95_ms", "p50_ms", "max_ms", "count", "sql_count", "sql_ms"]
+
+
+class Command(BaseCommand):
+    help = "Summarize a JSON operation log (social/oplog.py) into the slowest operations and SQL statements"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Log file written by the social.oplog logger")
+        parser.add_argument("--top", type=int, default=10)
+        parser.add_argument("--sort", choices=SORT_KEYS, default="p95_ms", help="Operation ordering")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options["path"]) as f:
+                operations, statements = oplog.summarize(f, options["top"], options["sort"])
+        except OSError as e:
+            raise CommandError(str(e))
+
+        header = (
+            f"{'operation':<24}{'hash':<14}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}"
+            f"{'queries':>9}{'sql ms':>10}{'slow':>6}"
+        )
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for r in operations:
+            self.stdout.write(
+                f"{r['operation'][:23]:<24}{r['hash']:<14}{r['count']:>7}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}"
+                f"{r['max_ms']:>10.1f}{r['sql_count']:>9.1f}{r['sql_ms']:>10.1f}{r['slow']:>6}"
+            )
+
+        self.stdout.write("")
+        header = f"{'max ms':>10}{'avg ms':>10}{'count':>7}  statement"
+        self.stdout.write(header)
+        self.stdout.write("-" * 80)
+        for r in statements:
+            sql = " ".join(r["sql"].split())
+            self.stdout.write(f"{r['max_ms']:>10.1f}{r['avg_ms']:>10.1f}{r['count']:>7}  {sql[:200]}")
+            if r["plan"]:
+                for line in r["plan"].splitlines()[:5]:
+                    self.stdout.write(f"{'':>29}{line}")
@@ -0,0 +1,31 @@
+"""
+Content-addressed media storage.
+
+Uploads are stored under the SHA-256 of their bytes, so a path always refers
+to the same content: it can be cached forever by browsers and CDNs, and
+re-uploading an identical file doesn't store a second copy.
+"""
+
+import hashlib
+import os
+import re
+
+from django.core.files.storage import default_storage
+
+CONTENT_ADDRESSED_PATH = re.compile(r"(?:^|/)(?P<digest>[0-9a-f]{64})(?:\.[A-Za-z0-9]+)?$")
+
+
+def content_addressed_name(prefix, upload):
+    digest = hashlib.sha256()
+    for chunk in upload.chunks():
+        digest.update(chunk)
+    upload.seek(0)
+    extension = os.path.splitext(upload.name)[1].lower()
+    return f"{prefix}/{digest.hexdigest()}{extension}"
+
+
+def save_content_addressed(prefix, upload):
+    name = content_addressed_name(prefix, upload)
+    if default_storage.exists(name):
+        return name
+    return default_storage.save(name, upload)
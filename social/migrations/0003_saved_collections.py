@@ -0,0 +1,59 @@
+# Generated by Django 5.1.15 on 2026-10-19 15:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def remove_duplicate_saves(apps, schema_editor):
+    # Keep the oldest save of each (user, post) so the unique constraint applies.
+    PostSave = apps.get_model("social", "PostSave")
+    db = schema_editor.connection.alias
+    keep = (
+        PostSave.objects.using(db).values("user", "post")
+        .annotate(keep_id=Min("id"))
+        .values_list("keep_id", flat=True)
+    )
+    PostSave.objects.using(db).exclude(id__in=list(keep)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0002_follow_postlike'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_saves, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='postsave',
+            unique_together={('user', 'post')},
+        ),
+        migrations.CreateModel(
+            name='SavedCollection',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('name', models.CharField(max_length=100)),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(class)s_created', to=settings.AUTH_USER_MODEL)),
+                ('updated_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(class)s_updated', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saved_collections', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='postsave',
+            name='collection',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='saves', to='social.savedcollection'),
+        ),
+        migrations.AddIndex(
+            model_name='postsave',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='postsave_user_created_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='savedcollection',
+            unique_together={('user', 'name')},
+        ),
+    ]
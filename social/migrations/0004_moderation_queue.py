@@ -0,0 +1,102 @@
+# Generated by Django 5.1.15 on 2026-10-19 15:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def backfill_report_targets(apps, schema_editor):
+    Report = apps.get_model("social", "Report")
+    ReportTarget = apps.get_model("social", "ReportTarget")
+    db = schema_editor.connection.alias
+    aggregates = (
+        Report.objects.using(db).values("content_type", "object_id")
+        .annotate(count=Count("id"), severity=Max("severity"), last=Max("created_at"))
+        .order_by()
+    )
+    ReportTarget.objects.using(db).bulk_create(
+        (
+            ReportTarget(
+                content_type_id=row["content_type"],
+                object_id=row["object_id"],
+                report_count=row["count"],
+                max_severity=row["severity"],
+                last_reported_at=row["last"],
+            )
+            for row in aggregates.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('social', '0003_saved_collections'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportTarget',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.PositiveIntegerField()),
+                ('report_count', models.PositiveIntegerField(default=0)),
+                ('max_severity', models.PositiveSmallIntegerField(default=0)),
+                ('last_reported_at', models.DateTimeField(null=True)),
+                ('status', models.CharField(choices=[('open', 'Open'), ('resolved', 'Resolved')], default='open', max_length=10)),
+                ('action', models.CharField(blank=True, max_length=10)),
+                ('resolved_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='is_hidden',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='is_hidden',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='severity',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='story',
+            name='is_hidden',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['content_type', 'object_id', 'is_hidden'], name='comment_target_visible_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['created_by', 'is_hidden'], name='post_author_visible_idx'),
+        ),
+        migrations.AddField(
+            model_name='reporttarget',
+            name='content_type',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype'),
+        ),
+        migrations.AddField(
+            model_name='reporttarget',
+            name='resolved_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='reporttarget',
+            index=models.Index(fields=['status', '-max_severity', '-report_count', '-id'], name='reporttarget_queue_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='reporttarget',
+            unique_together={('content_type', 'object_id')},
+        ),
+        migrations.RunPython(backfill_report_targets, migrations.RunPython.noop),
+    ]
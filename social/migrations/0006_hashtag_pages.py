@@ -0,0 +1,109 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count
+
+# Same weights as social.hashtags at the time of this migration.
+LIKE_WEIGHT = 1
+COMMENT_WEIGHT = 2
+
+BATCH_SIZE = 1000
+
+
+def copy_batch(apps, db, post_type, links):
+    HashtagPost = apps.get_model("social", "HashtagPost")
+    Post = apps.get_model("social", "Post")
+    PostLike = apps.get_model("social", "PostLike")
+    Comment = apps.get_model("social", "Comment")
+    post_ids = {post_id for _, post_id in links}
+    created = dict(Post.objects.using(db).filter(pk__in=post_ids).values_list("pk", "created_at"))
+    likes = dict(
+        PostLike.objects.using(db).filter(post_id__in=post_ids).values("post_id").annotate(n=Count("id")).values_list("post_id", "n")
+    )
+    comments = {}
+    if post_type is not None:
+        comments = dict(
+            Comment.objects.using(db).filter(content_type=post_type, object_id__in=post_ids)
+            .values("object_id")
+            .annotate(n=Count("id"))
+            .values_list("object_id", "n")
+        )
+    HashtagPost.objects.using(db).bulk_create(
+        HashtagPost(
+            hashtag_id=hashtag_id,
+            post_id=post_id,
+            created_at=created[post_id],
+            score=likes.get(post_id, 0) * LIKE_WEIGHT + comments.get(post_id, 0) * COMMENT_WEIGHT,
+        )
+        for hashtag_id, post_id in links
+    )
+
+
+def copy_links(apps, schema_editor):
+    Hashtag = apps.get_model("social", "Hashtag")
+    HashtagPost = apps.get_model("social", "HashtagPost")
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    OldLink = Hashtag._meta.get_field("posts").remote_field.through
+    db = schema_editor.connection.alias
+
+    post_type = ContentType.objects.using(db).filter(app_label="social", model="post").first()
+    links = OldLink.objects.using(db).order_by("pk").values_list("hashtag_id", "post_id")
+    # Stream the links and copy them in fixed-size batches, so memory stays
+    # flat however many posts are tagged.
+    batch = []
+    for link in links.iterator(chunk_size=BATCH_SIZE):
+        batch.append(link)
+        if len(batch) == BATCH_SIZE:
+            copy_batch(apps, db, post_type, batch)
+            batch = []
+    if batch:
+        copy_batch(apps, db, post_type, batch)
+    for hashtag_id, count in (
+        HashtagPost.objects.using(db).values("hashtag_id").annotate(n=Count("id")).values_list("hashtag_id", "n").iterator()
+    ):
+        Hashtag.objects.using(db).filter(pk=hashtag_id).update(post_count=count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('social', '0005_archival'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hashtag',
+            name='post_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='HashtagPost',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('score', models.IntegerField(default=0)),
+                ('hashtag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='links', to='social.hashtag')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hashtag_links', to='social.post')),
+            ],
+            options={
+                'indexes': [
+                    models.Index(fields=['hashtag', '-created_at', '-id'], name='hashtagpost_recent_idx'),
+                    models.Index(fields=['hashtag', '-score', '-id'], name='hashtagpost_top_idx'),
+                ],
+                'unique_together': {('hashtag', 'post')},
+            },
+        ),
+        migrations.RunPython(copy_links, migrations.RunPython.noop),
+        # Django can't add through= to an existing ManyToManyField, so the
+        # auto-created table is dropped and the field re-added on HashtagPost.
+        migrations.RemoveField(
+            model_name='hashtag',
+            name='posts',
+        ),
+        migrations.AddField(
+            model_name='hashtag',
+            name='posts',
+            field=models.ManyToManyField(related_name='hashtags', through='social.HashtagPost', to='social.post'),
+        ),
+    ]
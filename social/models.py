@@ -1,5 +1,7 @@
 from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
 
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
@@ -34,6 +36,16 @@ class Post(BaseModel):
     caption = models.TextField()
     image = models.ImageField(upload_to="posts/")
     likes = models.ManyToManyField(User, related_name="liked_posts", blank=True)
+    is_hidden = models.BooleanField(default=False)  # Hidden by moderation
+    deleted_at = models.DateTimeField(null=True, blank=True)  # Soft-deleted, archived later
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_by", "is_hidden"], name="post_author_visible_idx"),
+            models.Index(
+                fields=["deleted_at"], name="post_deleted_idx", condition=models.Q(deleted_at__isnull=False)
+            ),
+        ]
 
     def __str__(self):
         return f"Post by {self.created_by.username}"
@@ -47,6 +59,12 @@ class Comment(BaseModel):
 
     text = models.TextField()
     parent = models.ForeignKey("self", null=True, blank=True, on_delete=models.CASCADE, related_name="replies")
+    is_hidden = models.BooleanField(default=False)  # Hidden by moderation
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["content_type", "object_id", "is_hidden"], name="comment_target_visible_idx"),
+        ]
 
     def __str__(self):
         return f"Comment by {self.created_by.username}"
@@ -56,6 +74,10 @@ class Comment(BaseModel):
 class Story(BaseModel):
     image = models.ImageField(upload_to="stories/")
     viewers = models.ManyToManyField(User, related_name="viewed_stories", blank=True)
+    is_hidden = models.BooleanField(default=False)  # Hidden by moderation
+
+    class Meta:
+        indexes = [models.Index(fields=["created_at"], name="story_created_idx")]
 
     def __str__(self):
         return f"Story by {self.created_by.username}"
@@ -68,6 +90,9 @@ class Message(BaseModel):
     text = models.TextField()
     seen = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [models.Index(fields=["created_at"], name="message_created_idx")]
+
     def __str__(self):
         return f"Message from {self.sender.username} to {self.receiver.username}"
 
@@ -78,6 +103,9 @@ class Notification(BaseModel):
     text = models.TextField()
     is_read = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [models.Index(fields=["created_at"], name="notification_created_idx")]
+
     def __str__(self):
         return f"Notification for {self.user.username}"
 
@@ -85,16 +113,58 @@ class Notification(BaseModel):
 # Hashtag Model
 class Hashtag(models.Model):
     name = models.CharField(max_length=50, unique=True)
-    posts = models.ManyToManyField(Post, related_name="hashtags")
+    posts = models.ManyToManyField(Post, related_name="hashtags", through="HashtagPost")
+    post_count = models.PositiveIntegerField(default=0)  # Maintained by social.hashtags
 
     def __str__(self):
         return f"#{self.name}"
 
 
+# A post's membership in a hashtag, with what the tag page sorts by, so a
+# page of top or recent posts is a range scan on one index.
+class HashtagPost(models.Model):
+    hashtag = models.ForeignKey(Hashtag, on_delete=models.CASCADE, related_name="links")
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="hashtag_links")
+    created_at = models.DateTimeField(default=timezone.now)
+    score = models.IntegerField(default=0)  # Likes and comments, see social.hashtags
+
+    class Meta:
+        unique_together = ("hashtag", "post")
+        indexes = [
+            models.Index(fields=["hashtag", "-created_at", "-id"], name="hashtagpost_recent_idx"),
+            models.Index(fields=["hashtag", "-score", "-id"], name="hashtagpost_top_idx"),
+        ]
+
+    def __str__(self):
+        return f"#{self.hashtag_id} on post {self.post_id}"
+
+
+# Named group of saved posts, e.g. "Recipes"
+class SavedCollection(BaseModel):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="saved_collections")
+    name = models.CharField(max_length=100)
+
+    class Meta:
+        unique_together = ("user", "name")
+
+    def __str__(self):
+        return f"{self.user.username}/{self.name}"
+
+
 # Post Save (For saved posts/bookmarks)
 class PostSave(BaseModel):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     post = models.ForeignKey(Post, on_delete=models.CASCADE)
+    collection = models.ForeignKey(
+        SavedCollection, null=True, blank=True, on_delete=models.SET_NULL, related_name="saves"
+    )
+
+    class Meta:
+        unique_together = ("user", "post")  # A post is saved at most once per user
+        indexes = [
+            # savedPosts pages through a user's saves newest first.
+            models.Index(fields=["user", "-created_at", "-id"], name="postsave_user_created_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.username} saved a post"
@@ -108,11 +178,42 @@ class Report(BaseModel):
     object_id = models.PositiveIntegerField()
     content_object = GenericForeignKey("content_type", "object_id")
     reason = models.TextField()
+    severity = models.PositiveSmallIntegerField(default=1)  # 1 (low) .. 3 (high)
 
     def __str__(self):
         return f"Report by {self.reported_by.username}"
 
 
+# One row per reported object, kept up to date as reports come in, so the
+# moderation queue is an index scan instead of a GROUP BY over every report.
+class ReportTarget(models.Model):
+    OPEN = "open"
+    RESOLVED = "resolved"
+    STATUS_CHOICES = [(OPEN, "Open"), (RESOLVED, "Resolved")]
+
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    content_object = GenericForeignKey("content_type", "object_id")
+    report_count = models.PositiveIntegerField(default=0)
+    max_severity = models.PositiveSmallIntegerField(default=0)
+    last_reported_at = models.DateTimeField(null=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=OPEN)
+    action = models.CharField(max_length=10, blank=True)
+    resolved_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL)
+    resolved_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ("content_type", "object_id")
+        indexes = [
+            models.Index(
+                fields=["status", "-max_severity", "-report_count", "-id"], name="reporttarget_queue_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.report_count} reports on {self.content_type.model} {self.object_id}"
+
+
 class PostLike(BaseModel):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="post_likes")  # Changed from "likes" to "post_likes"
@@ -129,8 +230,58 @@ class Follow(BaseModel):
         unique_together = ('follower', 'following')  # Prevent duplicate follows
 
 
+# Rows moved out of the hot tables by social.archive. One table for every
+# source, bucketed by the month the row was created so old months can be
+# pruned with a single range delete.
+class ArchivedRow(models.Model):
+    source = models.CharField(max_length=50)  # Archive policy name, e.g. "messages"
+    partition = models.PositiveIntegerField()  # YYYYMM of the row's created_at
+    original_id = models.BigIntegerField()
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("source", "original_id")
+        indexes = [models.Index(fields=["source", "partition"], name="archivedrow_partition_idx")]
+
+    def __str__(self):
+        return f"{self.source} {self.original_id}"
 
 
+# Account deletions waiting for the archive_data command. Keeps the id rather
+# than a foreign key so the row outlives the user.
+class AccountDeletion(models.Model):
+    deleted_user_id = models.BigIntegerField(unique=True)
+    username = models.CharField(max_length=150)
+    requested_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
 
+    def __str__(self):
+        return f"Deletion of {self.username}"
+
+
+# Background task queue, see social/tasks.py. Finished tasks are deleted;
+# tasks that used up their attempts stay as FAILED for inspection.
+class QueuedTask(models.Model):
+    QUEUED = "queued"
+    RUNNING = "running"
+    FAILED = "failed"
+    STATUS_CHOICES = [(QUEUED, "Queued"), (RUNNING, "Running"), (FAILED, "Failed")]
+
+    name = models.CharField(max_length=200)
+    args = models.JSONField(default=list, encoder=DjangoJSONEncoder)
+    kwargs = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [models.Index(fields=["status", "run_at"], name="queuedtask_claim_idx")]
 
+    def __str__(self):
+        return f"{self.name} ({self.status})"
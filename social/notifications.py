@@ -0,0 +1,10 @@
+from .models import Notification
+from .tasks import task
+
+
+@task(max_attempts=3)
+def notify(user_id, actor_id, text):
+    """Notify user_id of something actor_id did; a no-op for one's own actions."""
+    if user_id == actor_id:
+        return None
+    return Notification.objects.create(user_id=user_id, text=text, created_by_id=actor_id, updated_by_id=actor_id)
@@ -0,0 +1,278 @@
+"""
+Structured per-operation logging for the GraphQL endpoint.
+
+OperationLogMiddleware writes one JSON line per GraphQL request to the
+"social.oplog" logger, when it is enabled for INFO (OPERATION_LOG_ENABLED or
+OPERATION_LOG_FILE in settings):
+
+    {"type": "operation", "operation": "Feed", "hash": "<sha256 of the query>",
+     "variables": {"postId": "str"}, "viewer": 42, "status": 200,
+     "duration_ms": 812.4, "sql_count": 6, "sql_ms": 640.2,
+     "cache": {"jwt_user": {"hits": 1, "misses": 0}}, "slow": true,
+     "slow_queries": [{"alias": "default", "sql": "SELECT ...", "ms": 402.1}]}
+
+Variables are logged by shape (name -> type), never by value. When an
+operation takes longer than OPERATION_LOG["SLOW_MS"], a sample of them
+(EXPLAIN_SAMPLE_RATE) also gets EXPLAIN plans for their EXPLAIN_TOP
+slowest SELECTs. Those run on a background thread with its own connection
+and are logged as {"type": "explain", ...} lines.
+`manage.py summarize_oplog` turns the log into top-N tables.
+"""
+
+import contextvars
+import hashlib
+import heapq
+import itertools
+import json
+import logging
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger("social.oplog")
+
+DEFAULTS = {"SLOW_MS": 500, "EXPLAIN_SAMPLE_RATE": 0.1, "EXPLAIN_TOP": 3}
+
+_current = contextvars.ContextVar("social_oplog_stats", default=None)
+
+_OPERATION_NAME = re.compile(r"\b(?:query|mutation|subscription)\s+([_A-Za-z][_0-9A-Za-z]*)")
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, "OPERATION_LOG", {})}
+
+
+class OperationStats:
+    """SQL timings and cache hits of one request; also the execute wrapper."""
+
+    def __init__(self, keep_slowest):
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.cache = {}
+        self.keep_slowest = keep_slowest
+        self.slowest = []  # min-heap of (seconds, seq, alias, sql, params)
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def wrapper(self, alias):
+        def execute(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                self.add_query(alias, sql, params, time.perf_counter() - started)
+
+        return execute
+
+    def add_query(self, alias, sql, params, seconds):
+        with self._lock:
+            self.sql_count += 1
+            self.sql_seconds += seconds
+            entry = (seconds, next(self._seq), alias, sql, params)
+            if len(self.slowest) < self.keep_slowest:
+                heapq.heappush(self.slowest, entry)
+            elif self.keep_slowest:
+                heapq.heappushpop(self.slowest, entry)
+
+    def note_cache(self, name, hit):
+        counts = self.cache.setdefault(name, {"hits": 0, "misses": 0})
+        counts["hits" if hit else "misses"] += 1
+
+
+def note_cache(name, hit):
+    """Count a cache hit or miss against the operation being logged, if any."""
+    stats = _current.get()
+    if stats is not None:
+        stats.note_cache(name, hit)
+
+
+def query_hash(query):
+    return hashlib.sha256((query or "").encode()).hexdigest()
+
+
+def operation_name_of(query, operation_name=None):
+    if operation_name:
+        return operation_name
+    match = _OPERATION_NAME.search(query or "")
+    return match.group(1) if match else None
+
+
+def variables_shape(variables):
+    if not isinstance(variables, dict):
+        return {}
+    return {name: type(value).__name__ for name, value in variables.items()}
+
+
+_explain_executor = None
+_explain_lock = threading.Lock()
+
+
+def _get_explain_executor():
+    global _explain_executor
+    with _explain_lock:
+        if _explain_executor is None:
+            _explain_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="oplog-explain")
+        return _explain_executor
+
+
+def _explain(operation_hash, statements):
+    try:
+        for seconds, _, alias, sql, params in statements:
+            connection = connections[alias]
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute(connection.ops.explain_query_prefix() + " " + sql, params)
+                    plan = "\n".join(" ".join(str(col) for col in row) for row in cursor.fetchall())
+            except Exception as e:
+                plan = f"EXPLAIN failed: {e}"
+            logger.info(
+                json.dumps(
+                    {
+                        "type": "explain",
+                        "hash": operation_hash,
+                        "alias": alias,
+                        "sql": sql,
+                        "ms": round(seconds * 1000, 2),
+                        "plan": plan,
+                    }
+                )
+            )
+    finally:
+        # Worker threads keep their own connections; don't leak them.
+        connections.close_all()
+
+
+def explain_in_background(operation_hash, statements):
+    selects = [s for s in statements if s[3].lstrip().upper().startswith("SELECT")]
+    if selects:
+        return _get_explain_executor().submit(_explain, operation_hash, selects)
+    return None
+
+
+class OperationLogMiddleware:
+    """Django middleware logging every request that ran a GraphQL operation.
+
+    CachedGraphQLView stores the parsed request in request._graphql_operation;
+    requests without it (admin, media, GraphiQL) aren't logged.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not logger.isEnabledFor(logging.INFO):
+            return self.get_response(request)
+        config = get_config()
+        stats = OperationStats(config["EXPLAIN_TOP"])
+        token = _current.set(stats)
+        installed = []
+        for connection in connections.all():
+            wrapper = stats.wrapper(connection.alias)
+            connection.execute_wrappers.append(wrapper)
+            installed.append((connection, wrapper))
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            duration = time.perf_counter() - started
+            for connection, wrapper in installed:
+                connection.execute_wrappers.remove(wrapper)
+            _current.reset(token)
+
+        operation = getattr(request, "_graphql_operation", None)
+        if operation is not None:
+            self.log(request, response, operation, stats, duration, config)
+        return response
+
+    def log(self, request, response, operation, stats, duration, config):
+        query, variables, operation_name = operation
+        user = getattr(request, "user", None)
+        slowest = sorted(stats.slowest, reverse=True)
+        slow = duration * 1000 >= config["SLOW_MS"]
+        record = {
+            "type": "operation",
+            "operation": operation_name_of(query, operation_name),
+            "hash": query_hash(query),
+            "variables": variables_shape(variables),
+            "viewer": user.pk if user is not None and user.is_authenticated else None,
+            "method": request.method,
+            "status": response.status_code,
+            "duration_ms": round(duration * 1000, 2),
+            "sql_count": stats.sql_count,
+            "sql_ms": round(stats.sql_seconds * 1000, 2),
+            "cache": stats.cache,
+            "slow": slow,
+        }
+        if slow:
+            record["slow_queries"] = [
+                {"alias": alias, "sql": sql, "ms": round(seconds * 1000, 2)}
+                for seconds, _, alias, sql, _ in slowest
+            ]
+        logger.info(json.dumps(record))
+        if slow and random.random() < config["EXPLAIN_SAMPLE_RATE"]:
+            explain_in_background(record["hash"], slowest)
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def summarize(lines, top=10, sort="p95_ms"):
+    """Top-N operations and slow statements from an operation log's lines.
+
+    Lines that aren't JSON (other loggers sharing the file) are skipped.
+    """
+    operations = {}
+    statements = {}
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if not isinstance(record, dict):
+            continue
+        if record.get("type") == "operation":
+            key = (record["operation"], record["hash"])
+            operations.setdefault(key, []).append(record)
+            for query in record.get("slow_queries", ()):
+                statements.setdefault(query["sql"], {"ms": [], "plan": None})["ms"].append(query["ms"])
+        elif record.get("type") == "explain":
+            entry = statements.setdefault(record["sql"], {"ms": [], "plan": None})
+            entry["plan"] = entry["plan"] or record["plan"]
+
+    operation_rows = []
+    for (name, operation_hash), records in operations.items():
+        durations = [r["duration_ms"] for r in records]
+        operation_rows.append(
+            {
+                "operation": name or "(anonymous)",
+                "hash": operation_hash[:12],
+                "count": len(records),
+                "p50_ms": _percentile(durations, 0.5),
+                "p95_ms": _percentile(durations, 0.95),
+                "max_ms": max(durations),
+                "sql_count": sum(r["sql_count"] for r in records) / len(records),
+                "sql_ms": sum(r["sql_ms"] for r in records) / len(records),
+                "slow": sum(1 for r in records if r.get("slow")),
+            }
+        )
+    operation_rows.sort(key=lambda row: row[sort], reverse=True)
+
+    statement_rows = [
+        {
+            "sql": sql,
+            "count": len(entry["ms"]),
+            "avg_ms": sum(entry["ms"]) / len(entry["ms"]) if entry["ms"] else 0.0,
+            "max_ms": max(entry["ms"], default=0.0),
+            "plan": entry["plan"],
+        }
+        for sql, entry in statements.items()
+    ]
+    statement_rows.sort(key=lambda row: (row["max_ms"], row["count"]), reverse=True)
+    return operation_rows[:top], statement_rows[:top]
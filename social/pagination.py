@@ -0,0 +1,105 @@
+"""
+Keyset (cursor) pagination for GraphQL connections.
+
+A cursor encodes the ordering values of the last row on a page, so the next
+page is a range scan on an index instead of an OFFSET that re-reads
+everything before it.
+"""
+
+import base64
+import json
+from datetime import datetime
+
+import graphene
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+from graphql import GraphQLError
+
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(values):
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor, fields):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise GraphQLError("Invalid cursor.")
+    if not isinstance(values, list) or len(values) != len(fields):
+        raise GraphQLError("Invalid cursor.")
+    return values
+
+
+def _after_filter(ordering, values):
+    # (a, b) after (x, y) in "-a, -b" order: a < x OR (a = x AND b < y)
+    condition = Q()
+    for i, field in enumerate(ordering):
+        name = field.lstrip("-")
+        lookup = "lt" if field.startswith("-") else "gt"
+        step = Q(**{f"{name}__{lookup}": values[i]})
+        for prev_field, prev_value in zip(ordering[:i], values[:i]):
+            step &= Q(**{prev_field.lstrip("-"): prev_value})
+        condition |= step
+    return condition
+
+
+def keyset_page(queryset, ordering, first=20, after=None, cursor_source=None):
+    """Return (rows, end_cursor, has_next_page) for one page of queryset.
+
+    ordering lists the fields to order by, ending with a unique one (usually
+    "-id"). cursor_source maps a row to the object holding those fields,
+    when the rows themselves don't (e.g. a save row wrapping a post).
+    """
+    first = max(0, min(first or 20, MAX_PAGE_SIZE))
+    queryset = queryset.order_by(*ordering)
+    if after:
+        queryset = queryset.filter(_after_filter(ordering, decode_cursor(after, ordering)))
+    rows = list(queryset[: first + 1])
+    has_next_page = len(rows) > first
+    rows = rows[:first]
+    return rows, [_cursor(row, ordering, cursor_source) for row in rows], has_next_page
+
+
+def keyset_pages(queryset, partition_by, ordering, first=20, cursor_source=None):
+    """The first keyset_page() of every partition_by value in queryset, in one query.
+
+    Returns {value: (rows, cursors, has_next_page)}; values without rows are
+    left out. Later pages are per partition: a cursor only means something
+    within the partition it came from, so page on with keyset_page(). And
+    ROW_NUMBER() numbers every row of a partition, so for a single partition
+    keyset_page() is cheaper anyway: its index walk stops after one page.
+    """
+    first = max(0, min(first or 20, MAX_PAGE_SIZE))
+    order_by = [F(f[1:]).desc() if f.startswith("-") else F(f).asc() for f in ordering]
+    queryset = (
+        queryset.annotate(page_row=Window(RowNumber(), partition_by=F(partition_by), order_by=order_by))
+        .filter(page_row__lte=first + 1)
+        .order_by(partition_by, *ordering)
+    )
+    grouped = {}
+    for row in queryset:
+        grouped.setdefault(getattr(row, partition_by), []).append(row)
+    return {
+        value: (rows[:first], [_cursor(row, ordering, cursor_source) for row in rows[:first]], len(rows) > first)
+        for value, rows in grouped.items()
+    }
+
+
+def _cursor(row, ordering, cursor_source):
+    source = cursor_source(row) if cursor_source else row
+    return encode_cursor([getattr(source, f.lstrip("-")) for f in ordering])
+
+
+def build_connection(connection_type, nodes, cursors, has_next_page):
+    return connection_type(
+        edges=[connection_type.Edge(node=node, cursor=cursor) for node, cursor in zip(nodes, cursors)],
+        page_info=graphene.relay.PageInfo(
+            has_next_page=has_next_page,
+            has_previous_page=False,
+            start_cursor=cursors[0] if cursors else None,
+            end_cursor=cursors[-1] if cursors else None,
+        ),
+    )
@@ -0,0 +1,185 @@
+"""
+Password hashing off the request thread.
+
+Hashing is deliberately slow, so a burst of logins or signups can pin every
+worker. hash_password() and verify_password() run the hasher in a bounded
+process pool (settings.PASSWORD_HASHING_WORKERS processes, at most
+PASSWORD_HASHING_QUEUE jobs in flight) and fail fast with PasswordHashingBusy
+when the pool is saturated. With PASSWORD_HASHING_WORKERS = 0 everything runs
+inline, which is what tests and management commands want.
+
+The pool bounds CPU use; a sync caller still waits on its thread for the
+hash. Async callers use ahash_password(), averify_password() and
+acheck_user_password(), which await the pool without holding a thread.
+"""
+
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model, hashers
+from django.contrib.auth.backends import ModelBackend
+
+
+class PasswordHashingBusy(Exception):
+    pass
+
+
+_executor = None
+_slots = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor, _slots
+    workers = getattr(settings, "PASSWORD_HASHING_WORKERS", 0)
+    if not workers:
+        return None, None
+    with _executor_lock:
+        if _executor is None:
+            # The pool starts lazily inside a threaded server, and a forked
+            # child could inherit a lock another thread holds (logging, the
+            # import lock, a database driver). Start workers from a clean
+            # process instead; it inherits DJANGO_SETTINGS_MODULE from the
+            # environment.
+            methods = multiprocessing.get_all_start_methods()
+            _executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn"),
+                initializer=django.setup,
+            )
+            _slots = threading.BoundedSemaphore(getattr(settings, "PASSWORD_HASHING_QUEUE", workers * 4))
+    return _executor, _slots
+
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown()
+            _executor = None
+
+
+def _with_hashers(password_hashers, fn, *args):
+    # Runs in a worker, which loaded settings itself and so misses runtime
+    # changes to PASSWORD_HASHERS in the parent (override_settings in tests
+    # and benchmarks).
+    if settings.PASSWORD_HASHERS != password_hashers:
+        settings.PASSWORD_HASHERS = password_hashers
+        hashers.reset_hashers(setting="PASSWORD_HASHERS")
+    return fn(*args)
+
+
+def _busy():
+    return PasswordHashingBusy("Too many password operations in progress, try again shortly.")
+
+
+def _submit(executor, slots, fn, args):
+    # The caller holds a slot; it is released when the job finishes.
+    try:
+        future = executor.submit(_with_hashers, list(settings.PASSWORD_HASHERS), fn, *args)
+    except Exception:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    return future
+
+
+def _run(fn, *args):
+    executor, slots = _get_executor()
+    if executor is None:
+        return fn(*args)
+    if not slots.acquire(timeout=getattr(settings, "PASSWORD_HASHING_WAIT", 1.0)):
+        raise _busy()
+    return _submit(executor, slots, fn, args).result()
+
+
+async def _arun(fn, *args):
+    executor, slots = _get_executor()
+    if executor is None:
+        return fn(*args)
+    # A blocking acquire() would stall the event loop, so poll for a slot.
+    deadline = time.monotonic() + getattr(settings, "PASSWORD_HASHING_WAIT", 1.0)
+    while not slots.acquire(blocking=False):
+        if time.monotonic() >= deadline:
+            raise _busy()
+        await asyncio.sleep(0.01)
+    return await asyncio.wrap_future(_submit(executor, slots, fn, args))
+
+
+def hash_password(raw_password):
+    return _run(hashers.make_password, raw_password)
+
+
+def verify_password(raw_password, encoded):
+    """Return (is_correct, must_update) like django's verify_password."""
+    return _run(hashers.verify_password, raw_password, encoded)
+
+
+async def ahash_password(raw_password):
+    return await _arun(hashers.make_password, raw_password)
+
+
+async def averify_password(raw_password, encoded):
+    return await _arun(hashers.verify_password, raw_password, encoded)
+
+
+def check_user_password(user, raw_password):
+    """user.check_password() with the hashing done in the pool.
+
+    Upgrades the stored hash when PASSWORD_HASHERS prefers a different
+    algorithm or work factor, the same way Django does on login.
+    """
+    is_correct, must_update = verify_password(raw_password, user.password)
+    if is_correct and must_update:
+        user.password = hash_password(raw_password)
+        user.save(update_fields=["password"])
+    return is_correct
+
+
+async def acheck_user_password(user, raw_password):
+    is_correct, must_update = await averify_password(raw_password, user.password)
+    if is_correct and must_update:
+        user.password = await ahash_password(raw_password)
+        await user.asave(update_fields=["password"])
+    return is_correct
+
+
+class PooledModelBackend(ModelBackend):
+    """ModelBackend that verifies passwords through the hashing pool."""
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Same timing guard as ModelBackend (#20760).
+            hash_password(password)
+            return None
+        if check_user_password(user, password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        # Called by django.contrib.auth.aauthenticate() on Django 5.2+.
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = await UserModel._default_manager.aget(**{UserModel.USERNAME_FIELD: username})
+        except UserModel.DoesNotExist:
+            await ahash_password(password)
+            return None
+        if await acheck_user_password(user, password) and self.user_can_authenticate(user):
+            return user
+        return None
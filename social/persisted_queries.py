@@ -0,0 +1,35 @@
+"""
+Persisted operations clients can run with GET /graphql/?id=<name or sha256>.
+
+GET requests with a short id instead of the full query text make URLs small
+and stable, which is what HTTP caches key on.
+"""
+
+import hashlib
+
+PERSISTED_QUERIES = {
+    "Feed": """
+        query Feed {
+            posts { id caption image createdAt createdBy { id username } viewerHasLiked viewerHasSaved }
+        }
+    """,
+    "Stories": """
+        query Stories {
+            stories { id image createdAt createdBy { id username } }
+        }
+    """,
+    "SavedPosts": """
+        query SavedPosts($collection: String, $first: Int, $after: String) {
+            savedPosts(collection: $collection, first: $first, after: $after) {
+                edges { cursor node { id caption image } }
+                pageInfo { hasNextPage endCursor }
+            }
+        }
+    """,
+}
+
+_BY_HASH = {hashlib.sha256(query.encode()).hexdigest(): query for query in PERSISTED_QUERIES.values()}
+
+
+def get_persisted_query(operation_id):
+    return PERSISTED_QUERIES.get(operation_id) or _BY_HASH.get(operation_id)
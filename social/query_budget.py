@@ -0,0 +1,297 @@
+"""
+Query-count, latency and memory budgets for every root Query and Mutation field.
+
+Each case in CASES runs against a dataset seeded at every size in SIZES. A
+field whose SQL query count grows with the data has an N+1 somewhere, so the
+count must be the same at every size; time and peak traced memory at the
+largest size must stay within budget. Background tasks are queued, not
+run, as in production, so a mutation is measured up to its primary write.
+Every size is seeded inside a
+transaction that is rolled back afterwards, so this needs a throwaway
+database: it runs in the test suite, and `manage.py query_budget` prints the
+report table.
+"""
+
+import time
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from graphql_jwt.shortcuts import get_token
+
+from .auth import user_cache
+from .benchmark import PIXEL_PNG, ClientTransport
+from .models import (
+    Comment,
+    Hashtag,
+    HashtagPost,
+    Message,
+    Notification,
+    Post,
+    PostLike,
+    PostSave,
+    Report,
+    ReportTarget,
+    SavedCollection,
+    Story,
+)
+
+User = get_user_model()
+
+SIZES = (10, 1000)
+
+# At the largest size.
+TIME_BUDGET_MS = 5000
+MEMORY_BUDGET_KIB = 128 * 1024
+
+
+def seed_budget_dataset(size):
+    """size rows of every kind of content, owned by or visible to the viewer."""
+    password = make_password("password123")
+    viewer = User.objects.create(username="budget_viewer", password=password, is_staff=True)
+    other = User.objects.create(username="budget_other", password=password)
+    audit = {"created_by": viewer, "updated_by": viewer}
+    other_audit = {"created_by": other, "updated_by": other}
+
+    posts = Post.objects.bulk_create(
+        Post(caption=f"post {i}", image=f"posts/{i}.png", **audit) for i in range(size)
+    )
+    stories = Story.objects.bulk_create(Story(image=f"stories/{i}.png", **audit) for i in range(size))
+    Story.viewers.through.objects.bulk_create(
+        Story.viewers.through(story_id=story.pk, user_id=other.pk) for story in stories
+    )
+    post_type = ContentType.objects.get_for_model(Post)
+    comments = Comment.objects.bulk_create(
+        Comment(content_type=post_type, object_id=post.pk, text="nice", **other_audit) for post in posts
+    )
+    Comment.objects.bulk_create(
+        Comment(content_type=post_type, object_id=c.object_id, text="thanks", parent=c, **audit) for c in comments
+    )
+    PostLike.objects.bulk_create(PostLike(user=other, post=post, **other_audit) for post in posts)
+    collection = SavedCollection.objects.create(user=viewer, name="favourites", **audit)
+    PostSave.objects.bulk_create(PostSave(user=viewer, post=post, collection=collection, **audit) for post in posts)
+    hashtags = Hashtag.objects.bulk_create(Hashtag(name=f"tag{i}") for i in range(size))
+    HashtagPost.objects.bulk_create(
+        HashtagPost(hashtag=hashtags[0], post=post, created_at=post.created_at, score=post.pk % 7) for post in posts
+    )
+    HashtagPost.objects.bulk_create(
+        HashtagPost(hashtag=tag, post=post, created_at=post.created_at) for tag, post in zip(hashtags[1:], posts[1:])
+    )
+    Message.objects.bulk_create(Message(sender=viewer, receiver=other, text=f"hi {i}", **audit) for i in range(size))
+    Notification.objects.bulk_create(Notification(user=viewer, text=f"note {i}", **audit) for i in range(size))
+    Report.objects.bulk_create(
+        Report(reported_by=other, content_type=post_type, object_id=post.pk, reason="spam", **other_audit)
+        for post in posts
+    )
+    ReportTarget.objects.bulk_create(
+        ReportTarget(content_type=post_type, object_id=post.pk, report_count=1, max_severity=1) for post in posts
+    )
+    return {
+        "viewer": viewer,
+        "other": other,
+        "post_id": posts[0].pk,
+        "story_id": stories[0].pk,
+        "target_ids": list(ReportTarget.objects.values_list("pk", flat=True)),
+    }
+
+
+# name -> builder(dataset) -> (query, variables, files). Reads run before
+# writes; deleteAccount deactivates the viewer, so it goes last.
+CASES = {
+    "users": lambda ds: ("{ users { id username } }", {}, None),
+    "posts": lambda ds: (
+        "{ posts { id caption image createdBy { username } viewerHasLiked viewerHasSaved"
+        " hashtags { name } postLikes { user { username } } } }",
+        {},
+        None,
+    ),
+    "comments": lambda ds: (
+        "{ comments { id text createdBy { username } parent { id } replies { text createdBy { username } }"
+        " contentObject { id } } }",
+        {},
+        None,
+    ),
+    "stories": lambda ds: ("{ stories { id image createdBy { username } viewers { username } } }", {}, None),
+    "messages": lambda ds: ("{ messages { text sender { username } receiver { username } } }", {}, None),
+    "notifications": lambda ds: ("{ notifications { text user { username } } }", {}, None),
+    "hashtags": lambda ds: (
+        "{ hashtags { name postCount"
+        " topPosts(first: 5) { edges { node { caption createdBy { username } viewerHasLiked } } }"
+        " recentPosts(first: 5) { edges { node { caption } } pageInfo { hasNextPage } } } }",
+        {},
+        None,
+    ),
+    "hashtag": lambda ds: (
+        "{ hashtag(name: \"tag0\") { postCount"
+        " topPosts(first: 20) { edges { cursor node { caption createdBy { username } viewerHasLiked } } }"
+        " recentPosts(first: 20) { edges { node { caption } } pageInfo { hasNextPage endCursor } } } }",
+        {},
+        None,
+    ),
+    "postSaves": lambda ds: (
+        "{ postSaves { id user { username } post { caption } collection { name } } }",
+        {},
+        None,
+    ),
+    "savedPosts": lambda ds: (
+        "{ savedPosts(first: 50) { edges { node { caption createdBy { username } viewerHasLiked } }"
+        " pageInfo { hasNextPage } } }",
+        {},
+        None,
+    ),
+    "savedCollections": lambda ds: ("{ savedCollections { name } }", {}, None),
+    "moderationQueue": lambda ds: (
+        "{ moderationQueue(first: 50) { edges { node { id contentType objectId reportCount } } } }",
+        {},
+        None,
+    ),
+    "reports": lambda ds: ("{ reports { id reason reportedBy { username } } }", {}, None),
+    "registerUser": lambda ds: (
+        "mutation { registerUser(username: \"budget_new\", email: \"new@example.com\", password: \"pw123456\")"
+        " { user { id } } }",
+        {},
+        None,
+    ),
+    "tokenAuth": lambda ds: (
+        "mutation { tokenAuth(username: \"budget_viewer\", password: \"password123\") { token } }",
+        {},
+        None,
+    ),
+    "verifyToken": lambda ds: (
+        "mutation($token: String!) { verifyToken(token: $token) { payload } }",
+        {"token": get_token(ds["viewer"])},
+        None,
+    ),
+    "refreshToken": lambda ds: (
+        "mutation($token: String!) { refreshToken(token: $token) { token } }",
+        {"token": get_token(ds["viewer"])},
+        None,
+    ),
+    "createPost": lambda ds: (
+        "mutation($image: Upload!, $by: ID!) { createPost(caption: \"new\", image: $image, createdBy: $by)"
+        " { post { id } } }",
+        {"image": None, "by": ds["viewer"].pk},
+        {"image": ("budget.png", PIXEL_PNG, "image/png")},
+    ),
+    "uploadPostImage": lambda ds: (
+        "mutation($image: Upload!) { uploadPostImage(image: $image, caption: \"up\") { success } }",
+        {"image": None},
+        {"image": ("budget.png", PIXEL_PNG, "image/png")},
+    ),
+    "uploadProfilePicture": lambda ds: (
+        "mutation($image: Upload!) { uploadProfilePicture(profilePicture: $image) { success } }",
+        {"image": None},
+        {"image": ("budget.png", PIXEL_PNG, "image/png")},
+    ),
+    "createComment": lambda ds: (
+        "mutation($post: ID!, $by: ID!) { createComment(postId: $post, createdBy: $by, text: \"hey\")"
+        " { comment { id } } }",
+        {"post": ds["post_id"], "by": ds["viewer"].pk},
+        None,
+    ),
+    "likePost": lambda ds: ("mutation($post: ID!) { likePost(postId: $post) { success } }", {"post": ds["post_id"]}, None),
+    "followUser": lambda ds: (
+        "mutation($user: ID!) { followUser(userId: $user) { success } }",
+        {"user": ds["other"].pk},
+        None,
+    ),
+    "savePost": lambda ds: (
+        "mutation($post: ID!) { savePost(postId: $post, collection: \"later\") { success } }",
+        {"post": ds["post_id"]},
+        None,
+    ),
+    "unsavePost": lambda ds: ("mutation($post: ID!) { unsavePost(postId: $post) { success } }", {"post": ds["post_id"]}, None),
+    "reportContent": lambda ds: (
+        "mutation($id: ID!) { reportContent(targetType: \"story\", targetId: $id, reason: \"spam\") { report { id } } }",
+        {"id": ds["story_id"]},
+        None,
+    ),
+    "resolveReports": lambda ds: (
+        "mutation($ids: [ID!]!) { resolveReports(ids: $ids, action: DISMISS) { resolved } }",
+        {"ids": ds["target_ids"]},
+        None,
+    ),
+    "deletePost": lambda ds: ("mutation($post: ID!) { deletePost(postId: $post) { success } }", {"post": ds["post_id"]}, None),
+    "deleteAccount": lambda ds: ("mutation { deleteAccount { success } }", {}, None),
+}
+
+
+def _measure(transport, request, trace_memory):
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            result = transport.execute(*request)
+            elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    errors = result.get("errors") or []
+    return {
+        "queries": len(ctx.captured_queries),
+        "ms": round(elapsed * 1000, 2),
+        "peak_kib": None if peak is None else round(peak / 1024),
+        "error": errors[0].get("message") if errors else None,
+    }
+
+
+def run_budget(sizes=SIZES, cases=None):
+    """Return {case: {size: measurement}}; each size is rolled back afterwards."""
+    cases = cases or list(CASES)
+    report = {name: {} for name in cases}
+    for size in sizes:
+        # Start every size equally cold, or a lookup cached by the first
+        # size looks like a query that disappears at the next.
+        user_cache.clear()
+        ContentType.objects.clear_cache()
+        with transaction.atomic(), override_settings(TASKS={"EAGER": False}):
+            dataset = seed_budget_dataset(size)
+            transport = ClientTransport(get_token(dataset["viewer"]))
+            for name in cases:
+                request = CASES[name](dataset)
+                measurement = _measure(transport, request, trace_memory=False)
+                if request[0].lstrip().startswith("{"):
+                    # Reads are run again to trace memory, keeping the
+                    # tracing overhead out of the timing.
+                    measurement["peak_kib"] = _measure(transport, request, trace_memory=True)["peak_kib"]
+                report[name][size] = measurement
+            transaction.set_rollback(True)
+        user_cache.clear()
+    return report
+
+
+def check_budget(report, time_budget_ms=TIME_BUDGET_MS, memory_budget_kib=MEMORY_BUDGET_KIB):
+    """Return a list of human readable budget violations."""
+    problems = []
+    for name, by_size in report.items():
+        largest = by_size[max(by_size)]
+        counts = {size: m["queries"] for size, m in by_size.items()}
+        if len(set(counts.values())) > 1:
+            problems.append(f"{name}: query count grows with data {counts}")
+        for size, m in by_size.items():
+            if m["error"]:
+                problems.append(f"{name}@{size}: {m['error']}")
+        if largest["ms"] > time_budget_ms:
+            problems.append(f"{name}: {largest['ms']}ms over the {time_budget_ms}ms budget")
+        if largest["peak_kib"] is not None and largest["peak_kib"] > memory_budget_kib:
+            problems.append(f"{name}: {largest['peak_kib']} KiB over the {memory_budget_kib} KiB budget")
+    return problems
+
+
+def format_report(report):
+    sizes = sorted({size for by_size in report.values() for size in by_size})
+    header = f"{'field':<22}" + "".join(f"{f'queries@{s}':>14}" for s in sizes)
+    header += "".join(f"{f'ms@{s}':>11}" for s in sizes) + f"{f'peak KiB@{sizes[-1]}':>16}"
+    lines = [header, "-" * len(header)]
+    for name, by_size in report.items():
+        line = f"{name:<22}" + "".join(f"{by_size[s]['queries']:>14}" for s in sizes)
+        line += "".join(f"{by_size[s]['ms']:>11.1f}" for s in sizes)
+        peak = by_size[sizes[-1]]["peak_kib"]
+        line += f"{'-' if peak is None else peak:>16}"
+        lines.append(line)
+    return "\n".join(lines)
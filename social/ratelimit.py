@@ -0,0 +1,170 @@
+"""
+Token-bucket rate limiting for GraphQL root fields.
+
+Each limited field has a bucket per viewer (user id, or client IP when
+anonymous) described in settings.RATE_LIMITS:
+
+    RATE_LIMITS = {
+        "STORE": "social.ratelimit.LocalBucketStore",
+        "TRUST_X_FORWARDED_FOR": False,
+        "FIELDS": {
+            # capacity tokens, refilled at refill_rate tokens/second,
+            # and every call to the field costs `cost` tokens.
+            "likePost": {"capacity": 30, "refill_rate": 1.0, "cost": 1},
+        },
+    }
+
+Rejected calls fail with a GraphQL error carrying
+``extensions = {"code": "RATE_LIMITED", "retryAfter": <seconds>}``.
+"""
+
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from graphql import GraphQLError
+
+
+def _take(state, now, cost, capacity, refill_rate):
+    """Refill a (tokens, updated_at) bucket and try to take cost tokens.
+
+    Returns (new_state, retry_after) where retry_after is 0 when allowed.
+    """
+    if state is None:
+        tokens = capacity
+    else:
+        tokens = min(capacity, state[0] + (now - state[1]) * refill_rate)
+    if tokens >= cost:
+        return (tokens - cost, now), 0.0
+    if refill_rate <= 0 or cost > capacity:
+        return (tokens, now), math.inf
+    return (tokens, now), (cost - tokens) / refill_rate
+
+
+class LocalBucketStore:
+    """In-process buckets, sharded so concurrent threads rarely share a lock."""
+
+    def __init__(self, shards=32, max_keys_per_shard=10000):
+        self._shards = [({}, threading.Lock()) for _ in range(shards)]
+        self.max_keys_per_shard = max_keys_per_shard
+
+    def consume(self, key, cost, capacity, refill_rate):
+        buckets, lock = self._shards[hash(key) % len(self._shards)]
+        with lock:
+            state, retry_after = _take(buckets.pop(key, None), time.monotonic(), cost, capacity, refill_rate)
+            # Re-inserting keeps dict order least-recently-used first, so the
+            # idlest bucket is the cheapest one to evict.
+            buckets[key] = state
+            if len(buckets) > self.max_keys_per_shard:
+                del buckets[next(iter(buckets))]
+        return retry_after
+
+    def clear(self):
+        for buckets, lock in self._shards:
+            with lock:
+                buckets.clear()
+
+
+class CacheBucketStore:
+    """Buckets in a Django cache, shared by every process using that cache.
+
+    Read-modify-write is not atomic, so racing requests on different nodes can
+    occasionally both get a token; that's an acceptable overshoot for
+    throttling and keeps the check to one get_many and one set.
+
+    The cache is usually shared with other data, so clear() doesn't empty
+    it: buckets are stamped with a generation that clear() bumps, and
+    buckets from an older generation count as full.
+    """
+
+    def __init__(self, alias="default", prefix="ratelimit"):
+        self.cache = caches[alias]
+        self.prefix = prefix
+        self.generation_key = f"{prefix}:generation"
+
+    def consume(self, key, cost, capacity, refill_rate):
+        cache_key = f"{self.prefix}:{key}"
+        found = self.cache.get_many([self.generation_key, cache_key])
+        generation = found.get(self.generation_key, 0)
+        stamped = found.get(cache_key)
+        state = stamped[1] if stamped is not None and stamped[0] == generation else None
+        state, retry_after = _take(state, time.time(), cost, capacity, refill_rate)
+        # Expire once the bucket would be full again anyway.
+        timeout = math.ceil(capacity / refill_rate) if refill_rate > 0 else None
+        self.cache.set(cache_key, (generation, state), timeout)
+        return retry_after
+
+    def clear(self):
+        self.cache.add(self.generation_key, 0, None)
+        self.cache.incr(self.generation_key)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(path, **options):
+    """Return the process-wide store for path; buckets must outlive requests."""
+    key = (path, tuple(sorted(options.items())))
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = import_string(path)(**options)
+        return _stores[key]
+
+
+def client_ip(request, trust_forwarded_for=False):
+    if trust_forwarded_for:
+        forwarded = request.META.get("HTTP_X_FORWARDED_FOR")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.META.get("REMOTE_ADDR", "unknown")
+
+
+class RateLimitMiddleware:
+    """Graphene middleware applying RATE_LIMITS to root fields.
+
+    Must run after the JWT middleware so the viewer is known; graphene runs
+    the last entry of GRAPHENE["MIDDLEWARE"] first, so list it before it.
+    """
+
+    def __init__(self):
+        config = getattr(settings, "RATE_LIMITS", {})
+        self.fields = config.get("FIELDS", {})
+        self.trust_forwarded_for = config.get("TRUST_X_FORWARDED_FOR", False)
+        self.store = get_store(
+            config.get("STORE", "social.ratelimit.LocalBucketStore"),
+            **config.get("STORE_OPTIONS", {}),
+        )
+
+    def resolve(self, next, root, info, **kwargs):
+        if info.path.prev is None:
+            limit = self.fields.get(info.field_name)
+            if limit is not None:
+                self.check(info, limit)
+        return next(root, info, **kwargs)
+
+    def check(self, info, limit):
+        request = info.context
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            viewer = f"user:{user.pk}"
+        else:
+            viewer = f"ip:{client_ip(request, self.trust_forwarded_for)}"
+
+        retry_after = self.store.consume(
+            f"{viewer}:{info.field_name}",
+            limit.get("cost", 1),
+            limit["capacity"],
+            limit["refill_rate"],
+        )
+        if retry_after:
+            raise GraphQLError(
+                f"Rate limit exceeded for {info.field_name}.",
+                extensions={
+                    "code": "RATE_LIMITED",
+                    "retryAfter": None if math.isinf(retry_after) else math.ceil(retry_after),
+                },
+            )
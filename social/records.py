@@ -0,0 +1,160 @@
+"""
+"Values mode" for large read-only lists.
+
+A model instance carries every column, FieldFile wrappers and Django's
+per-instance state, and thousands of them dominate peak memory and GC time
+of big list responses. fetch_records() instead reads only the columns the
+GraphQL selection asks for with values_list(), joining single-valued
+relations like createdBy { username } into the same query, and wraps each
+row in a slotted record that graphene's default resolvers read like a model.
+
+Only types that inherit RecordType take part. A selection that needs
+anything else (many-to-many or reverse relations, custom resolvers not
+listed in record_fields) makes fetch_records() return None, and the caller
+falls back to model instances. Enable with settings.GRAPHQL_VALUES_MODE.
+"""
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from graphene.utils.str_converters import to_snake_case
+from graphene_django.registry import get_global_registry
+from graphql import FieldNode, FragmentSpreadNode, InlineFragmentNode
+
+
+class Record:
+    __slots__ = ()
+    _model = None
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    @property
+    def pk(self):
+        return self.id
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.id}>"
+
+
+_record_classes = {}
+
+
+def record_class(model, names):
+    key = (model, names)
+    cls = _record_classes.get(key)
+    if cls is None:
+        cls = _record_classes[key] = type(
+            f"{model.__name__}Record", (Record,), {"__slots__": names, "_model": model}
+        )
+    return cls
+
+
+class RecordType:
+    """Mixin for DjangoObjectTypes that can be resolved from records.
+
+    record_fields lists fields with custom resolvers that only need the
+    record's columns (usually just pk).
+    """
+
+    record_fields = ()
+
+    @classmethod
+    def is_type_of(cls, root, info):
+        if isinstance(root, Record):
+            return root._model is cls._meta.model
+        return super().is_type_of(root, info)
+
+
+class _Plan:
+    def __init__(self, model, names, relations):
+        self.names = names
+        self.relations = relations
+        self.record = record_class(model, names + tuple(name for name, _ in relations))
+
+    def lookups(self, prefix=""):
+        paths = [prefix + name for name in self.names]
+        for name, plan in self.relations:
+            paths += plan.lookups(f"{prefix}{name}__")
+        return paths
+
+    def build(self, row, offset=0):
+        end = offset + len(self.names)
+        values = row[offset:end]
+        related = []
+        for _, plan in self.relations:
+            record, end = plan.build(row, end)
+            related.append(record)
+        if values[0] is None:
+            return None, end  # Empty nullable foreign key.
+        return self.record(*values, *related), end
+
+
+def selected_fields(selection_set, fragments):
+    for selection in selection_set.selections:
+        if isinstance(selection, FieldNode):
+            yield selection
+        elif isinstance(selection, InlineFragmentNode):
+            yield from selected_fields(selection.selection_set, fragments)
+        elif isinstance(selection, FragmentSpreadNode):
+            yield from selected_fields(fragments[selection.name.value].selection_set, fragments)
+
+
+def _plan(model, selection_set, fragments):
+    graphene_type = get_global_registry().get_type_for_model(model)
+    if graphene_type is None or not issubclass(graphene_type, RecordType):
+        return None
+    names = ["id"]
+    relations = []
+    for node in selected_fields(selection_set, fragments):
+        name = to_snake_case(node.name.value)
+        if name in names or name == "__typename" or name in graphene_type.record_fields:
+            continue
+        if any(name == related for related, _ in relations):
+            continue
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return None
+        if not field.concrete or field.many_to_many:
+            return None
+        if isinstance(field, models.ForeignKey):
+            if node.selection_set is None:
+                return None
+            plan = _plan(field.related_model, node.selection_set, fragments)
+            if plan is None:
+                return None
+            relations.append((name, plan))
+        else:
+            names.append(name)
+    return _Plan(model, tuple(names), relations)
+
+
+def field_selection(info, path):
+    selection_set = info.field_nodes[0].selection_set
+    for name in path:
+        for node in selected_fields(selection_set, info.fragments):
+            if node.name.value == name:
+                selection_set = node.selection_set
+                break
+        else:
+            return None
+    return selection_set
+
+
+def fetch_records(queryset, info, path=()):
+    """Records for queryset holding just the selected columns, or None.
+
+    path leads from the resolved field to the node selection, e.g.
+    ("edges", "node") for a connection.
+    """
+    if not getattr(settings, "GRAPHQL_VALUES_MODE", False):
+        return None
+    selection_set = field_selection(info, path)
+    if selection_set is None:
+        return None
+    plan = _plan(queryset.model, selection_set, info.fragments)
+    if plan is None:
+        return None
+    return [plan.build(row)[0] for row in queryset.values_list(*plan.lookups()).iterator(chunk_size=2000)]
@@ -0,0 +1,144 @@
+"""
+Primary/replica routing for GraphQL traffic.
+
+Query operations read from the replicas listed in settings.DATABASE_REPLICAS,
+mutations and every write go to "default". After a mutation the client gets a
+short-lived cookie that pins its reads to the primary, so it can read its own
+writes even if the replicas lag behind. Code can also pin a single request with
+pin_to_primary(), as HTTP-cached GETs do.
+"""
+
+import itertools
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from graphql import OperationType
+
+PIN_COOKIE = "db_primary_pin"
+
+# "replica" while a read-only operation is executing, None otherwise.
+_route = ContextVar("db_route", default=None)
+_pinned = ContextVar("db_pinned", default=False)
+
+
+class ReplicaPool:
+    """Round-robin over replica aliases, skipping ones that fail a health check."""
+
+    def __init__(self, aliases, check_interval=5.0, check=None):
+        self.aliases = list(aliases)
+        self.check_interval = check_interval
+        self._check = check or self._ping
+        self._cycle = itertools.cycle(self.aliases) if self.aliases else None
+        self._checked_at = {}
+        self._healthy = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _ping(alias):
+        try:
+            connections[alias].ensure_connection()
+        except DatabaseError:
+            return False
+        return True
+
+    def is_healthy(self, alias):
+        now = time.monotonic()
+        if now - self._checked_at.get(alias, float("-inf")) >= self.check_interval:
+            self._checked_at[alias] = now
+            self._healthy[alias] = self._check(alias)
+        return self._healthy[alias]
+
+    def choose(self):
+        if self._cycle is None:
+            return None
+        with self._lock:
+            for _ in range(len(self.aliases)):
+                alias = next(self._cycle)
+                if self.is_healthy(alias):
+                    return alias
+        return None
+
+
+_pool = None
+
+
+def get_replica_pool():
+    global _pool
+    if _pool is None:
+        _pool = ReplicaPool(
+            getattr(settings, "DATABASE_REPLICAS", []),
+            check_interval=getattr(settings, "REPLICA_HEALTH_CHECK_INTERVAL", 5.0),
+        )
+    return _pool
+
+
+def pin_to_primary():
+    """Send the rest of this request's reads to the primary."""
+    # ReplicaRoutingMiddleware resets this when the request ends.
+    _pinned.set(True)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _route.get() != "replica" or _pinned.get():
+            return DEFAULT_DB_ALIAS
+        # Inside a transaction on the primary, stay there for consistency.
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return get_replica_pool().choose() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return True
+
+
+class ReplicaRoutingMiddleware:
+    """Django middleware scoping the routing state to one request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request._db_wrote_primary = False
+        pinned_token = _pinned.set(PIN_COOKIE in request.COOKIES)
+        route_token = _route.set(None)
+        try:
+            response = self.get_response(request)
+        finally:
+            _route.reset(route_token)
+            _pinned.reset(pinned_token)
+
+        if request._db_wrote_primary:
+            response.set_cookie(
+                PIN_COOKIE,
+                "1",
+                max_age=getattr(settings, "REPLICA_PIN_SECONDS", 5),
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+
+class ReplicaRoutingGraphQLMiddleware:
+    """Graphene middleware picking the route from the operation type."""
+
+    def resolve(self, next, root, info, **kwargs):
+        # Only route requests that went through ReplicaRoutingMiddleware, so
+        # the state is always reset afterwards.
+        if info.path.prev is None and hasattr(info.context, "_db_wrote_primary"):
+            if info.operation.operation == OperationType.MUTATION:
+                _route.set(None)
+                _pinned.set(True)
+                info.context._db_wrote_primary = True
+            else:
+                _route.set("replica")
+        return next(root, info, **kwargs)
@@ -1,7 +1,34 @@
 import graphene
 from graphene_django import DjangoObjectType
 from django.contrib.auth import get_user_model
-from .models import *
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.utils import timezone
+from .models import (
+    Comment,
+    Follow,
+    Hashtag,
+    HashtagPost,
+    Message,
+    Notification,
+    Post,
+    PostLike,
+    PostSave,
+    Profile,
+    Report,
+    ReportTarget,
+    SavedCollection,
+    Story,
+)
+from . import archive, hashtags, moderation
+from .http_cache import bump_watermark
+from .media import save_content_addressed
+from .notifications import notify
+from .loaders import hashtag_pages, viewer_post_flags
+from .pagination import build_connection, keyset_page, keyset_pages
+from .prefetch import with_selected_related
+from .records import RecordType, fetch_records
+from .passwords import PasswordHashingBusy, hash_password
 from graphene.types import Interface
 import graphql_jwt
 from graphql import GraphQLError
@@ -11,7 +38,7 @@ from graphene_file_upload.scalars import Upload
 
 User = get_user_model()
 
-class UserType(DjangoObjectType):
+class UserType(RecordType, DjangoObjectType):
     class Meta:
         model = User
         fields = ("id", "username", "email")
@@ -19,9 +46,7 @@ class UserType(DjangoObjectType):
 class ProfileType(DjangoObjectType):
     class Meta:
         model = Profile
-        fields = "__all__"
-
-from django.core.files.storage import default_storage
+        fields = ("id", "user", "bio", "profile_pic", "followers", "created_at", "updated_at")
 
 class UploadProfilePicture(graphene.Mutation):
     class Arguments:
@@ -35,11 +60,13 @@ class UploadProfilePicture(graphene.Mutation):
         if not user.is_authenticated:
             raise GraphQLError("Authentication required!")
 
-        profile, _ = Profile.objects.get_or_create(user=user)
+        profile, _ = Profile.objects.get_or_create(
+            user=user, defaults={"created_by": user, "updated_by": user}
+        )
 
         # Save file to media storage
-        file_path = default_storage.save(f"profile_pics/{profile_picture.name}", profile_picture)
-        profile.profile_picture = file_path
+        file_path = save_content_addressed("profile_pics", profile_picture)
+        profile.profile_pic = file_path
         profile.save()
 
         return UploadProfilePicture(success=True, profile=profile)
@@ -57,16 +84,28 @@ class CommentContentInterface(Interface):
     id = graphene.ID()
 
 # apply the Interface to PostType and StoryType
-class PostType(DjangoObjectType):
+class PostType(RecordType, DjangoObjectType):
+    viewer_has_liked = graphene.Boolean()
+    viewer_has_saved = graphene.Boolean()
+
+    record_fields = ("viewer_has_liked", "viewer_has_saved")
+
     class Meta:
         model = Post
-        fields = "__all__"
+        fields = ("id", "caption", "image", "likes", "post_likes", "hashtags", "created_at", "created_by", "updated_at")
         interfaces = (CommentContentInterface,)
 
-class StoryType(DjangoObjectType):
+    # Batched per request, see social/loaders.py.
+    def resolve_viewer_has_liked(self, info):
+        return viewer_post_flags(info).get("liked", self.pk)
+
+    def resolve_viewer_has_saved(self, info):
+        return viewer_post_flags(info).get("saved", self.pk)
+
+class StoryType(RecordType, DjangoObjectType):
     class Meta:
         model = Story
-        fields = "__all__"
+        fields = ("id", "image", "viewers", "created_at", "created_by", "updated_at")
         interfaces = (CommentContentInterface,)
 
 class CommentType(DjangoObjectType):
@@ -74,7 +113,7 @@ class CommentType(DjangoObjectType):
 
     class Meta:
         model = Comment
-        fields = "__all__"
+        fields = ("id", "text", "object_id", "parent", "replies", "created_at", "created_by", "updated_at")
 
     def resolve_content_object(self, info):
         if isinstance(self.content_object, Post):
@@ -83,6 +122,17 @@ class CommentType(DjangoObjectType):
             return self.content_object
         return None
 
+    # Comments hidden by moderation stay hidden when reached through a thread,
+    # as they are in the root comment fields.
+    def resolve_parent(self, info):
+        parent = self.parent
+        return None if parent is None or parent.is_hidden else parent
+
+    def resolve_replies(self, info):
+        if "replies" in getattr(self, "_prefetched_objects_cache", {}):
+            return [reply for reply in self.replies.all() if not reply.is_hidden]
+        return self.replies.filter(is_hidden=False)
+
 class UploadPostImage(graphene.Mutation):
     class Arguments:
         image = Upload(required=True)
@@ -97,13 +147,17 @@ class UploadPostImage(graphene.Mutation):
             raise GraphQLError("Authentication required!")
 
         # Save file properly
-        file_path = default_storage.save(f"post_images/{image.name}", image)
-
-        post = Post.objects.create(
-            created_by=user,
-            image=file_path,
-            caption=caption
-        )
+        file_path = save_content_addressed("post_images", image)
+
+        # Commit the post and its queued tasks together.
+        with transaction.atomic():
+            post = Post.objects.create(
+                created_by=user,
+                updated_by=user,
+                image=file_path,
+                caption=caption
+            )
+            hashtags.tag_new_post.delay(post.pk)
         return UploadPostImage(success=True, post=post)
 
 
@@ -112,27 +166,99 @@ class UploadPostImage(graphene.Mutation):
 class MessageType(DjangoObjectType):
     class Meta:
         model = Message
-        fields = "__all__"
+        fields = ("id", "sender", "receiver", "text", "seen", "created_at", "updated_at")
 
 class NotificationType(DjangoObjectType):
     class Meta:
         model = Notification
-        fields = "__all__"
+        fields = ("id", "user", "text", "is_read", "created_at", "updated_at")
+
+class HashtagPostConnection(graphene.relay.Connection):
+    class Meta:
+        node = PostType
 
 class HashtagType(DjangoObjectType):
+    top_posts = graphene.Field(HashtagPostConnection, first=graphene.Int(default_value=20), after=graphene.String())
+    recent_posts = graphene.Field(HashtagPostConnection, first=graphene.Int(default_value=20), after=graphene.String())
+
     class Meta:
         model = Hashtag
-        fields = "__all__"
+        fields = ("id", "name", "post_count")
+
+    # Both walk a HashtagPost index, see social/hashtags.py.
+    def resolve_top_posts(self, info, first, after=None):
+        return hashtag_page(self, info, ["-score", "-id"], first, after)
+
+    def resolve_recent_posts(self, info, first, after=None):
+        return hashtag_page(self, info, ["-created_at", "-id"], first, after)
+
+def hashtag_page(hashtag, info, ordering, first, after):
+    links = with_selected_related(
+        HashtagPost.objects.filter(post__is_hidden=False).select_related("post"),
+        info,
+        path=("edges", "node"),
+        prefix="post",
+    )
+    batch = hashtag_pages(info)
+    if hashtag.pk not in batch.hashtag_ids:
+        # hashtag(name:): one index walk.
+        rows, cursors, has_next_page = keyset_page(links.filter(hashtag=hashtag), ordering, first, after)
+        posts = viewer_post_flags(info).prime([link.post for link in rows])
+        return build_connection(HashtagPostConnection, posts, cursors, has_next_page)
+
+    # Inside hashtags: one query for the first pages of every listed hashtag.
+    # One `after` would be shared by all of them, but a cursor belongs to one
+    # hashtag's page; later pages come from hashtag(name:).
+    if after:
+        raise GraphQLError("after is not supported in hashtags; page on with hashtag(name:).")
+
+    def load(hashtag_ids):
+        pages = keyset_pages(links.filter(hashtag_id__in=hashtag_ids), "hashtag_id", ordering, first)
+        viewer_post_flags(info).prime([link.post for rows, _, _ in pages.values() for link in rows])
+        return pages
+
+    key = (tuple(k for k in info.path.as_list() if not isinstance(k, int)), tuple(ordering), first)
+    rows, cursors, has_next_page = batch.get(key, hashtag.pk, load)
+    return build_connection(HashtagPostConnection, [link.post for link in rows], cursors, has_next_page)
+
+class SavedCollectionType(DjangoObjectType):
+    class Meta:
+        model = SavedCollection
+        fields = ("id", "name", "created_at")
 
 class PostSaveType(DjangoObjectType):
     class Meta:
         model = PostSave
-        fields = "__all__"
+        fields = ("id", "user", "post", "collection", "created_at")
+
+class SavedPostConnection(graphene.relay.Connection):
+    class Meta:
+        node = PostType
 
 class ReportType(DjangoObjectType):
     class Meta:
         model = Report
-        fields = "__all__"
+        fields = ("id", "reported_by", "object_id", "reason", "severity", "created_at")
+
+class ReportTargetType(DjangoObjectType):
+    content_type = graphene.String()
+
+    class Meta:
+        model = ReportTarget
+        fields = ("id", "object_id", "report_count", "max_severity", "last_reported_at", "status")
+
+    def resolve_content_type(self, info):
+        # get_for_id is served from ContentType's cache after the first call.
+        return ContentType.objects.get_for_id(self.content_type_id).model
+
+class ModerationQueueConnection(graphene.relay.Connection):
+    class Meta:
+        node = ReportTargetType
+
+class ModerationAction(graphene.Enum):
+    DISMISS = moderation.DISMISS
+    HIDE = moderation.HIDE
+    DELETE = moderation.DELETE
 
 class CreatePost(graphene.Mutation):
     class Arguments:
@@ -146,14 +272,16 @@ class CreatePost(graphene.Mutation):
         user = User.objects.get(id=created_by)
 
         #  Save image properly
-        file_path = default_storage.save(f"post_images/{image.name}", image)
+        file_path = save_content_addressed("post_images", image)
 
-        post = Post.objects.create(
-            caption=caption,
-            image=file_path,
-            created_by=user,
-            updated_by=user  # Fix: Assign same user to updated_by
-        )
+        with transaction.atomic():
+            post = Post.objects.create(
+                caption=caption,
+                image=file_path,
+                created_by=user,
+                updated_by=user  # Fix: Assign same user to updated_by
+            )
+            hashtags.tag_new_post.delay(post.pk)
 
         return CreatePost(post=post)
 
@@ -170,13 +298,22 @@ class CreateComment(graphene.Mutation):
     def mutate(self, info, text, post_id, created_by):
         user = User.objects.get(id=created_by)
         post = Post.objects.get(id=post_id)
-        comment = Comment.objects.create(text=text, content_object=post, created_by=user)
+        with transaction.atomic():
+            comment = Comment.objects.create(text=text, content_object=post, created_by=user, updated_by=user)
+            notify.delay(post.created_by_id, user.pk, f"{user.username} commented on your post")
         return CreateComment(comment=comment)
 
 # Authentication Mutations
 class ObtainToken(graphql_jwt.ObtainJSONWebToken):
     user = graphene.Field(UserType)
 
+    @classmethod
+    def mutate(cls, root, info, **kwargs):
+        try:
+            return super().mutate(root, info, **kwargs)
+        except PasswordHashingBusy as e:
+            raise GraphQLError(str(e), extensions={"code": "BUSY"})
+
     def resolve_user(self, info, **kwargs):
         return info.context.user
 
@@ -195,16 +332,27 @@ class RegisterUser(graphene.Mutation):
     user = graphene.Field(UserType)
 
     def mutate(self, info, username, email, password):
-        user = User.objects.create_user(username=username, email=email, password=password)
+        try:
+            hashed = hash_password(password)
+        except PasswordHashingBusy as e:
+            raise GraphQLError(str(e), extensions={"code": "BUSY"})
+        # What create_user() does, with the hash computed in the pool.
+        user = User.objects.create(
+            username=User.normalize_username(username),
+            email=User.objects.normalize_email(email),
+            password=hashed,
+        )
         return RegisterUser(user=user)
 
 class PostLikeType(DjangoObjectType):
     class Meta:
         model = PostLike
+        fields = ("id", "user", "post", "created_at")
 
 class FollowType(DjangoObjectType):
     class Meta:
         model = Follow
+        fields = ("id", "follower", "following", "created_at")
 
 class LikePost(graphene.Mutation):
     class Arguments:
@@ -219,14 +367,18 @@ class LikePost(graphene.Mutation):
 
         post = Post.objects.get(id=post_id)
 
-        # Check if user already liked
-        like, created = PostLike.objects.get_or_create(user=user, post=post)
+        with transaction.atomic():
+            # Check if user already liked
+            like, created = PostLike.objects.get_or_create(
+                user=user, post=post, defaults={"created_by": user, "updated_by": user}
+            )
+            if created:
+                notify.delay(post.created_by_id, user.pk, f"{user.username} liked your post")
+            else:
+                like.delete()  # Unlike the post if already liked
 
-        if not created:
-            like.delete()  # Unlike the post if already liked
-            return LikePost(success=False)
-        
-        return LikePost(success=True)
+        viewer_post_flags(info).forget(post.pk)
+        return LikePost(success=created)
 
 class FollowUser(graphene.Mutation):
     class Arguments:
@@ -243,14 +395,148 @@ class FollowUser(graphene.Mutation):
         if user == following:
             raise GraphQLError("You cannot follow yourself!")
 
-        follow, created = Follow.objects.get_or_create(follower=user, following=following)
+        with transaction.atomic():
+            follow, created = Follow.objects.get_or_create(
+                follower=user, following=following, defaults={"created_by": user, "updated_by": user}
+            )
+            if created:
+                notify.delay(following.pk, user.pk, f"{user.username} started following you")
+            else:
+                follow.delete()  # Unfollow if already followed
+
+        return FollowUser(success=created)
+
+
+class SavePost(graphene.Mutation):
+    class Arguments:
+        post_id = graphene.ID(required=True)
+        collection = graphene.String()
+
+    success = graphene.Boolean()
+    post_save = graphene.Field(PostSaveType)
 
-        if not created:
-            follow.delete()  # Unfollow if already followed
-            return FollowUser(success=False)
+    def mutate(self, info, post_id, collection=None):
+        user = info.context.user
+        if not user.is_authenticated:
+            raise GraphQLError("Authentication required!")
+
+        post = Post.objects.get(id=post_id)
+        saved_collection = None
+        if collection:
+            saved_collection, _ = SavedCollection.objects.get_or_create(
+                user=user, name=collection, defaults={"created_by": user, "updated_by": user}
+            )
+
+        post_save, created = PostSave.objects.get_or_create(
+            user=user,
+            post=post,
+            defaults={"collection": saved_collection, "created_by": user, "updated_by": user},
+        )
+        if not created and collection is not None and post_save.collection_id != getattr(saved_collection, "id", None):
+            # Saving an already saved post again moves it to the new collection.
+            post_save.collection = saved_collection
+            post_save.updated_by = user
+            post_save.save(update_fields=["collection", "updated_by", "updated_at"])
 
-        return FollowUser(success=True)
+        viewer_post_flags(info).forget(post.pk)
+        return SavePost(success=True, post_save=post_save)
 
+class UnsavePost(graphene.Mutation):
+    class Arguments:
+        post_id = graphene.ID(required=True)
+
+    success = graphene.Boolean()
+
+    def mutate(self, info, post_id):
+        user = info.context.user
+        if not user.is_authenticated:
+            raise GraphQLError("Authentication required!")
+
+        deleted, _ = PostSave.objects.filter(user=user, post_id=post_id).delete()
+        viewer_post_flags(info).forget(int(post_id))
+        return UnsavePost(success=deleted > 0)
+
+def require_staff(info):
+    user = info.context.user
+    if not user.is_authenticated:
+        raise GraphQLError("Authentication required!")
+    if not user.is_staff:
+        raise GraphQLError("Moderator access required!")
+    return user
+
+class ReportContent(graphene.Mutation):
+    class Arguments:
+        target_type = graphene.String(required=True)  # "post", "comment" or "story"
+        target_id = graphene.ID(required=True)
+        reason = graphene.String(required=True)
+        severity = graphene.Int(default_value=1)
+
+    report = graphene.Field(ReportType)
+
+    def mutate(self, info, target_type, target_id, reason, severity):
+        user = info.context.user
+        if not user.is_authenticated:
+            raise GraphQLError("Authentication required!")
+
+        models_by_name = {model._meta.model_name: model for model in moderation.REPORTABLE}
+        if target_type not in models_by_name:
+            raise GraphQLError(f"Cannot report a {target_type}.")
+        target = models_by_name[target_type].objects.get(id=target_id)
+
+        report = Report.objects.create(
+            reported_by=user,
+            content_object=target,
+            reason=reason,
+            severity=max(1, min(severity, 3)),
+            created_by=user,
+            updated_by=user,
+        )
+        return ReportContent(report=report)
+
+class ResolveReports(graphene.Mutation):
+    class Arguments:
+        ids = graphene.List(graphene.NonNull(graphene.ID), required=True)
+        action = ModerationAction(required=True)
+
+    resolved = graphene.Int()
+
+    def mutate(self, info, ids, action):
+        moderator = require_staff(info)
+        action = getattr(action, "value", action)  # graphene passes the enum member
+        return ResolveReports(resolved=moderation.resolve_targets(ids, action, moderator))
+
+
+class DeletePost(graphene.Mutation):
+    class Arguments:
+        post_id = graphene.ID(required=True)
+
+    success = graphene.Boolean()
+
+    def mutate(self, info, post_id):
+        user = info.context.user
+        if not user.is_authenticated:
+            raise GraphQLError("Authentication required!")
+
+        # Soft delete: hidden right away, moved to the archive later.
+        updated = Post.objects.filter(id=post_id, created_by=user, deleted_at__isnull=True).update(
+            is_hidden=True, deleted_at=timezone.now(), updated_by=user, updated_at=timezone.now()
+        )
+        if updated:
+            bump_watermark(Post)
+        return DeletePost(success=updated > 0)
+
+class DeleteAccount(graphene.Mutation):
+    success = graphene.Boolean()
+
+    def mutate(self, info):
+        user = info.context.user
+        if not user.is_authenticated:
+            raise GraphQLError("Authentication required!")
+
+        # The account is deactivated now; its data is purged in batches by
+        # a background task.
+        archive.request_account_deletion(user)
+        return DeleteAccount(success=True)
 
 
 class Mutation(graphene.ObjectType):
@@ -267,6 +553,12 @@ class Mutation(graphene.ObjectType):
     
     like_post = LikePost.Field()
     follow_user = FollowUser.Field()
+    save_post = SavePost.Field()
+    unsave_post = UnsavePost.Field()
+    report_content = ReportContent.Field()
+    resolve_reports = ResolveReports.Field()
+    delete_post = DeletePost.Field()
+    delete_account = DeleteAccount.Field()
 
 class Query(graphene.ObjectType):
     users = graphene.List(UserType)
@@ -276,7 +568,20 @@ class Query(graphene.ObjectType):
     messages = graphene.List(MessageType)
     notifications = graphene.List(NotificationType)
     hashtags = graphene.List(HashtagType)
+    hashtag = graphene.Field(HashtagType, name=graphene.String(required=True))
     post_saves = graphene.List(PostSaveType)
+    saved_posts = graphene.Field(
+        SavedPostConnection,
+        collection=graphene.String(),
+        first=graphene.Int(default_value=20),
+        after=graphene.String(),
+    )
+    saved_collections = graphene.List(SavedCollectionType)
+    moderation_queue = graphene.Field(
+        ModerationQueueConnection,
+        first=graphene.Int(default_value=20),
+        after=graphene.String(),
+    )
     reports = graphene.List(ReportType)
     
     def resolve_users(self, info):
@@ -292,7 +597,11 @@ class Query(graphene.ObjectType):
         if not user.is_authenticated:
             raise GraphQLError("Authentication required!")
 
-        return Post.objects.filter(created_by=user)  # ✅ Only return the user's posts
+        posts = Post.objects.filter(created_by=user, is_hidden=False)  # ✅ Only return the user's posts
+        records = fetch_records(posts, info)
+        if records is None:
+            records = list(with_selected_related(posts, info))
+        return viewer_post_flags(info).prime(records)
 
     
     def resolve_comments(self, info):
@@ -300,25 +609,90 @@ class Query(graphene.ObjectType):
         if not user.is_authenticated:
             raise GraphQLError("Authentication required!")
 
-        return Comment.objects.filter(content_object__created_by=user)  # ✅ Filter by user
+        # Comments on the user's visible posts
+        comments = Comment.objects.filter(
+            content_type=ContentType.objects.get_for_model(Post),
+            object_id__in=Post.objects.filter(created_by=user, is_hidden=False).values("id"),
+            is_hidden=False,
+        )
+        return with_selected_related(comments, info)
 
     
     def resolve_stories(self, info):
-        return Story.objects.all()
+        stories = Story.objects.filter(is_hidden=False)
+        records = fetch_records(stories, info)
+        return with_selected_related(stories, info) if records is None else records
     
     def resolve_messages(self, info):
-        return Message.objects.all()
+        return with_selected_related(Message.objects.all(), info)
     
     def resolve_notifications(self, info):
-        return Notification.objects.all()
+        return with_selected_related(Notification.objects.all(), info)
     
     def resolve_hashtags(self, info):
-        return Hashtag.objects.all()
+        return hashtag_pages(info).prime(list(Hashtag.objects.all()))
+
+    def resolve_hashtag(self, info, name):
+        return Hashtag.objects.filter(name=hashtags.normalize(name)).first()
     
     def resolve_post_saves(self, info):
-        return PostSave.objects.all()
+        user = info.context.user
+        if not user.is_authenticated:
+            raise GraphQLError("Authentication required!")
+
+        return with_selected_related(PostSave.objects.filter(user=user), info)  # Saves are private
+
+    def resolve_saved_posts(self, info, first, collection=None, after=None):
+        user = info.context.user
+        if not user.is_authenticated:
+            raise GraphQLError("Authentication required!")
+
+        saves = with_selected_related(
+            PostSave.objects.filter(user=user, post__is_hidden=False).select_related("post"),
+            info,
+            path=("edges", "node"),
+            prefix="post",
+        )
+        if collection is not None:
+            saves = saves.filter(collection__name=collection)
+        # Walks postsave_user_created_idx.
+        rows, cursors, has_next_page = keyset_page(saves, ["-created_at", "-id"], first, after)
+        posts = viewer_post_flags(info).prime([save.post for save in rows])
+        return build_connection(SavedPostConnection, posts, cursors, has_next_page)
+
+    def resolve_saved_collections(self, info):
+        user = info.context.user
+        if not user.is_authenticated:
+            raise GraphQLError("Authentication required!")
+
+        return SavedCollection.objects.filter(user=user).order_by("name")
     
     def resolve_reports(self, info):
-        return Report.objects.all()
+        require_staff(info)
+        return with_selected_related(Report.objects.all(), info)
+
+    def resolve_moderation_queue(self, info, first, after=None):
+        require_staff(info)
+        targets = ReportTarget.objects.filter(status=ReportTarget.OPEN)
+        # Walks reporttarget_queue_idx: most severe, most reported first.
+        rows, cursors, has_next_page = keyset_page(
+            targets, ["-max_severity", "-report_count", "-id"], first, after
+        )
+        return build_connection(ModerationQueueConnection, rows, cursors, has_next_page)
+
+_schema = None
+
+
+def get_schema():
+    global _schema
+    if _schema is None:
+        _schema = graphene.Schema(query=Query, mutation=Mutation)
+    return _schema
+
 
-schema = graphene.Schema(query=Query, mutation=Mutation)
+def __getattr__(name):
+    # `social.schema.schema` (GRAPHENE["SCHEMA"]) is built on first access, so
+    # importing the types alone doesn't pay for the schema build.
+    if name == "schema":
+        return get_schema()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
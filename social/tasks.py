@@ -0,0 +1,203 @@
+"""
+Background tasks for work that doesn't have to finish before a mutation
+returns.
+
+    @task(max_attempts=3)
+    def notify(user_id, actor_id, text):
+        ...
+
+    notify.delay(post.created_by_id, user.pk, "liked your post")
+
+delay() inserts a QueuedTask row in the caller's transaction. Callers wrap
+their primary write and delay() in one transaction.atomic(), so a task
+queued by a write that rolls back never runs and one queued by a write that
+commits can't be lost. Arguments are stored as JSON; pass ids, not model
+instances. `manage.py run_workers` claims and runs the rows: with
+SELECT ... FOR UPDATE SKIP LOCKED where the database supports it (Postgres),
+otherwise with a compare-and-swap UPDATE on the row (SQLite), so workers
+never wait on each other. A task that raises is retried with exponential
+backoff until max_attempts, then kept as FAILED. A running task whose
+worker died is claimed again after TASKS["LEASE_SECONDS"], so tasks run at
+least once and should be safe to run twice.
+
+With TASKS["EAGER"] (on in tests) delay() runs the task inline and lets its
+exceptions propagate.
+"""
+
+import functools
+import json
+import logging
+import os
+import socket
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, reset_queries, router, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import QueuedTask
+
+logger = logging.getLogger("social.tasks")
+
+DEFAULTS = {"EAGER": False, "LEASE_SECONDS": 300, "POLL_INTERVAL": 1.0, "MAX_RETRY_DELAY": 3600}
+
+# Candidates read per compare-and-swap claim; losing one race moves on to
+# the next instead of re-querying.
+CLAIM_CANDIDATES = 10
+
+_registry = {}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, "TASKS", {})}
+
+
+class Task:
+    def __init__(self, fn, name, max_attempts, retry_delay):
+        functools.update_wrapper(self, fn)
+        self.fn = fn
+        self.name = name
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+    def __call__(self, *args, **kwargs):
+        return self.fn(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        return self.enqueue(args, kwargs)
+
+    def enqueue(self, args=(), kwargs=None, run_at=None):
+        """Queue the task; returns the QueuedTask, or None when run eagerly."""
+        # Round trip through JSON in eager mode too, so tests catch
+        # arguments a worker couldn't receive.
+        args, kwargs = json.loads(json.dumps([list(args), kwargs or {}], cls=DjangoJSONEncoder))
+        if get_config()["EAGER"]:
+            self.fn(*args, **kwargs)
+            return None
+        return QueuedTask.objects.create(
+            name=self.name,
+            args=args,
+            kwargs=kwargs,
+            max_attempts=self.max_attempts,
+            run_at=run_at or timezone.now(),
+        )
+
+    def next_run_at(self, attempts):
+        delay = min(self.retry_delay * 2 ** (attempts - 1), get_config()["MAX_RETRY_DELAY"])
+        return timezone.now() + timedelta(seconds=delay)
+
+
+def task(fn=None, *, name=None, max_attempts=5, retry_delay=10):
+    """Register fn as a background task; retry_delay doubles after each failure."""
+
+    def register(fn):
+        registered = Task(fn, name or f"{fn.__module__}.{fn.__qualname__}", max_attempts, retry_delay)
+        if _registry.setdefault(registered.name, registered) is not registered:
+            raise ValueError(f"Task {registered.name!r} is already registered")
+        return registered
+
+    return register(fn) if fn is not None else register
+
+
+def get_task(name):
+    return _registry.get(name)
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _claimable(now):
+    lease = timedelta(seconds=get_config()["LEASE_SECONDS"])
+    return Q(status=QueuedTask.QUEUED, run_at__lte=now) | Q(status=QueuedTask.RUNNING, locked_at__lt=now - lease)
+
+
+def claim(worker_id):
+    """Mark the next due task as running for worker_id and return it, or None."""
+    now = timezone.now()
+    candidates = QueuedTask.objects.filter(_claimable(now)).order_by("run_at", "pk")
+    connection = connections[router.db_for_write(QueuedTask)]
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic(using=connection.alias):
+            job = candidates.select_for_update(skip_locked=True).first()
+            if job is None:
+                return None
+            job.status = QueuedTask.RUNNING
+            job.locked_by = worker_id
+            job.locked_at = now
+            job.attempts += 1
+            job.save(update_fields=["status", "locked_by", "locked_at", "attempts"])
+            return job
+
+    # attempts goes up with every claim, so it doubles as the row's version:
+    # the UPDATE only matches if nobody claimed the row since we read it.
+    for pk, status, attempts in candidates.values_list("pk", "status", "attempts")[:CLAIM_CANDIDATES]:
+        won = QueuedTask.objects.filter(pk=pk, status=status, attempts=attempts).update(
+            status=QueuedTask.RUNNING, locked_by=worker_id, locked_at=now, attempts=attempts + 1
+        )
+        if won:
+            return QueuedTask.objects.get(pk=pk)
+    return None
+
+
+def run(job):
+    """Run a claimed task; delete it on success, else schedule a retry. Returns success."""
+    task = get_task(job.name)
+    # Only touch the row if no other worker has claimed it since.
+    mine = QueuedTask.objects.filter(pk=job.pk, attempts=job.attempts)
+    try:
+        if task is None:
+            # Kept retrying: a worker running older code may not know it yet.
+            raise LookupError(f"Unknown task {job.name!r}")
+        task.fn(*job.args, **job.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            logger.error("Task %s (%s) failed for good after %s attempts:\n%s", job.pk, job.name, job.attempts, error)
+            mine.update(status=QueuedTask.FAILED, last_error=error, locked_by="", locked_at=None)
+        else:
+            run_at = task.next_run_at(job.attempts) if task else timezone.now() + timedelta(seconds=60)
+            logger.warning("Task %s (%s) failed, retrying at %s:\n%s", job.pk, job.name, run_at, error)
+            mine.update(status=QueuedTask.QUEUED, run_at=run_at, last_error=error, locked_by="", locked_at=None)
+        return False
+    mine.delete()
+    return True
+
+
+def _recycle_connections():
+    # What close_old_connections() does between requests, except for
+    # connections inside a transaction (a test case, or a caller's atomic()).
+    for connection in connections.all(initialized_only=True):
+        if not connection.in_atomic_block:
+            connection.close_if_unusable_or_obsolete()
+
+
+def work(worker_id=None, stop=None, burst=False, poll_interval=None):
+    """Claim and run tasks until stop is set, or the queue is empty with burst.
+
+    Returns how many tasks were run.
+    """
+    worker_id = worker_id or default_worker_id()
+    poll_interval = get_config()["POLL_INTERVAL"] if poll_interval is None else poll_interval
+    count = 0
+    while stop is None or not stop.is_set():
+        # Tasks are this process's requests: recycle connections like
+        # request boundaries do and don't let DEBUG's query log grow.
+        _recycle_connections()
+        reset_queries()
+        job = claim(worker_id)
+        if job is None:
+            if burst:
+                break
+            if stop is not None:
+                stop.wait(poll_interval)
+            else:
+                time.sleep(poll_interval)
+            continue
+        run(job)
+        count += 1
+    return count
@@ -1,3 +1,225 @@
-from django.shortcuts import render
+import mimetypes
+import os
+import re
 
-# Create your views here.
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseBadRequest,
+    HttpResponseForbidden,
+    StreamingHttpResponse,
+)
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from django.views.decorators.http import require_GET, require_safe
+from graphene_django.views import GraphQLView, HttpError
+from graphene_file_upload.django import FileUploadGraphQLView
+from graphql_jwt.exceptions import JSONWebTokenError
+
+from . import exporting, http_cache, oplog, routers
+from .media import CONTENT_ADDRESSED_PATH
+from .persisted_queries import get_persisted_query
+
+
+def _request_user(request):
+    # Session users come from AuthenticationMiddleware; API clients send the
+    # same JWT they use for /graphql/.
+    if request.user.is_authenticated:
+        return request.user
+    try:
+        return authenticate(request=request)
+    except JSONWebTokenError:
+        return None
+
+
+@require_GET
+def export_view(request, name):
+    """Stream a table as NDJSON (?format=ndjson) or columnar chunks (?format=columnar)."""
+    user = _request_user(request)
+    if user is None or not user.is_staff:
+        return HttpResponseForbidden("Staff authentication required.")
+
+    fmt = request.GET.get("format", "ndjson")
+    if name not in exporting.EXPORTABLE or fmt not in exporting.FORMATS:
+        return HttpResponseBadRequest("Unknown export or format.")
+    try:
+        chunk_size = min(int(request.GET.get("chunk_size", exporting.DEFAULT_CHUNK_SIZE)), 10000)
+    except ValueError:
+        return HttpResponseBadRequest("chunk_size must be an integer.")
+
+    response = StreamingHttpResponse(
+        exporting.export_lines(exporting.get_model(name), fmt, chunk_size),
+        content_type="application/x-ndjson",
+    )
+    response["Content-Disposition"] = f'attachment; filename="{name}.{fmt}.jsonl"'
+    return response
+
+
+class CachedGraphQLView(FileUploadGraphQLView):
+    """GraphQL endpoint whose read-only GET requests are HTTP cacheable.
+
+    GET /graphql/?id=Feed runs a persisted query. Cacheable GET responses get
+    an ETag and Cache-Control from http_cache; a matching If-None-Match is
+    answered with 304 before the query runs. There is no Last-Modified:
+    whole seconds can't tell apart two writes in the same second, so
+    If-Modified-Since could revalidate stale data. POST requests are handled
+    exactly as before.
+
+    Cacheable GETs read from the primary. The ETag carries the primary's
+    watermarks, and a lagging replica would cache pre-write data under it.
+    """
+
+    @staticmethod
+    def get_graphql_params(request, data):
+        query, variables, operation_name, id = GraphQLView.get_graphql_params(request, data)
+        if not query and id:
+            query = get_persisted_query(id)
+            if query is None:
+                raise HttpError(HttpResponseBadRequest("Unknown persisted query id."))
+        # For OperationLogMiddleware.
+        request._graphql_operation = (query, variables, operation_name)
+        return query, variables, operation_name, id
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method != "GET" or (self.graphiql and self.can_display_graphiql(request, {})):
+            return super().dispatch(request, *args, **kwargs)
+
+        try:
+            query, variables, operation_name, _ = self.get_graphql_params(request, {})
+        except HttpError:
+            return super().dispatch(request, *args, **kwargs)
+        policy = http_cache.policy_for(query, operation_name) if query else None
+        if policy is None:
+            response = super().dispatch(request, *args, **kwargs)
+            patch_cache_control(response, no_store=True)
+            return response
+
+        routers.pin_to_primary()
+        viewer = _request_user(request) if policy.scope == http_cache.PRIVATE else None
+        watermark = http_cache.get_watermark(policy.models)
+        etag = http_cache.compute_etag(query, variables, operation_name, viewer and viewer.pk, watermark)
+
+        response = get_conditional_response(request, etag=etag)
+        oplog.note_cache("http", hit=response is not None)
+        if response is None:
+            response = super().dispatch(request, *args, **kwargs)
+            if response.status_code != 200 or getattr(request, "_graphql_errors", False):
+                patch_cache_control(response, no_store=True)
+                return response
+        response["ETag"] = etag
+        response["Cache-Control"] = policy.cache_control
+        if policy.scope == http_cache.PRIVATE:
+            patch_vary_headers(response, ("Authorization", "Cookie"))
+        return response
+
+    def execute_graphql_request(self, request, *args, **kwargs):
+        result = super().execute_graphql_request(request, *args, **kwargs)
+        # Partial errors still return 200; they must not be cached.
+        request._graphql_errors = bool(result and result.errors)
+        return result
+
+
+IMMUTABLE_CACHE_CONTROL = {"public": True, "max_age": 31536000, "immutable": True}
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _parse_range(header, size):
+    """Return (start, end) inclusive for a single byte range, or None if unsatisfiable.
+
+    Anything we don't handle (multiple ranges, other units) returns "ignore",
+    which means the whole file is sent with 200 as RFC 9110 allows.
+    """
+    match = _RANGE.match(header.strip())
+    if not match:
+        return "ignore"
+    start, end = match.groups()
+    if not start and not end:
+        return "ignore"
+    if not start:
+        # Suffix range: the last N bytes.
+        length = int(end)
+        if length == 0 or size == 0:
+            return None
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or end < start:
+        return None
+    return start, end
+
+
+def _read_range(path, start, length, block_size=64 * 1024):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            block = f.read(min(block_size, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+
+
+@require_safe
+def media_view(request, path):
+    """Serve MEDIA_ROOT with validators, byte ranges and long-lived caching.
+
+    Content-addressed uploads (named by their SHA-256) never change, so they
+    are marked immutable for a year; anything else must revalidate.
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("Invalid path.")
+    try:
+        stat = os.stat(full_path)
+    except OSError:
+        raise Http404("File not found.")
+    if not os.path.isfile(full_path):
+        raise Http404("File not found.")
+
+    content_addressed = CONTENT_ADDRESSED_PATH.search(path)
+    if content_addressed:
+        etag = '"%s"' % content_addressed["digest"]
+    else:
+        etag = '"%x-%x"' % (stat.st_size, stat.st_mtime_ns)
+
+    def finish(response):
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(stat.st_mtime)
+        response["Accept-Ranges"] = "bytes"
+        if content_addressed:
+            patch_cache_control(response, **IMMUTABLE_CACHE_CONTROL)
+        else:
+            patch_cache_control(response, public=True, no_cache=True)
+        return response
+
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is not None:
+        return finish(response)
+
+    content_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+    byte_range = "ignore"
+    range_header = request.headers.get("Range")
+    if_range = request.headers.get("If-Range")
+    if range_header and (if_range is None or if_range == etag):
+        byte_range = _parse_range(range_header, stat.st_size)
+
+    if byte_range is None:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{stat.st_size}"
+        return finish(response)
+    if byte_range == "ignore":
+        return finish(FileResponse(open(full_path, "rb"), content_type=content_type))
+
+    start, end = byte_range
+    length = end - start + 1
+    response = StreamingHttpResponse(_read_range(full_path, start, length), status=206, content_type=content_type)
+    response["Content-Length"] = str(length)
+    response["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+    return finish(response)